@@ -1,4 +1,10 @@
-from app.api.router import master_router
-
 __all__ = ["master_router"]
 
+
+def __getattr__(name: str):
+    # Imported on first access: the routers pull in every service, and the services import app.api.schemas,
+    # so importing them eagerly here would make any service import go through the whole router tree first
+    if name == "master_router":
+        from app.api.router import master_router
+        return master_router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,32 @@
+from http import HTTPStatus
+from fastapi import Response
+
+
+class StoreETag:
+    """ETag of a manager's store, derived from its version counter.
+
+    `matches` tells whether the client's If-None-Match already names this
+    version, in which case a route can answer 304 before doing any work.
+    `*` matches too, since the store's collections always exist. A route
+    reading one entity uses `matches_version` instead, which ignores `*`:
+    the store's version says nothing about whether that entity exists.
+    """
+
+    def __init__(self, value: str | None, if_none_match: str | None):
+        self.value = value
+        listed = value is not None and if_none_match is not None
+        self.matches_version = listed and self._listed(value, if_none_match)
+        self.matches = listed and (self.matches_version or if_none_match.strip() == "*")
+
+    def not_modified(self) -> Response:
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={"ETag": self.value})
+
+    def apply(self, response: Response) -> None:
+        if self.value is not None:
+            response.headers["ETag"] = self.value
+
+    @staticmethod
+    def _listed(value: str, if_none_match: str) -> bool:
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return value.removeprefix("W/") in tags
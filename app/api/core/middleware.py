@@ -0,0 +1,99 @@
+import logging
+from time import perf_counter
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database.query_stats import QueryStats, current_query_stats
+from app.metrics import http_request_duration, http_requests, http_requests_in_flight
+from config import app_config
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Records latency, status and concurrency of every HTTP request.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so streamed responses aren't
+    buffered and the overhead stays at a few dict updates per request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            # The route template keeps label cardinality bounded, unlike the raw path
+            route = scope.get("route")
+            path = getattr(route, "path", "<unmatched>")
+            http_requests.inc(scope["method"], path, str(status))
+            http_request_duration.observe(perf_counter() - started, scope["method"], path)
+
+
+class QueryStatsMiddleware:
+    """Counts the SQL statements and database time of every HTTP request.
+
+    Outside production the totals are sent as X-DB-Query-Count and
+    X-DB-Time-Ms headers. A warning is logged when a request exceeds
+    QUERY_BUDGET statements or repeats one statement QUERY_REPEAT_THRESHOLD
+    times, which usually is a lazy load or a query issued in a loop (N+1).
+    Headers only cover statements run before the response starts; the
+    warning covers the whole request, streamed bodies included.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.send_headers = app_config.PROFILE != "production"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.1f}"
+            await send(message)
+
+        token = current_query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_with_headers if self.send_headers else send)
+        finally:
+            current_query_stats.reset(token)
+            self._check(scope, stats)
+
+    @staticmethod
+    def _check(scope: Scope, stats: QueryStats) -> None:
+        route = getattr(scope.get("route"), "path", scope["path"])
+        if stats.count > app_config.QUERY_BUDGET:
+            logger.warning(
+                "%s %s ran %d SQL statements (budget %d, %.1f ms)",
+                scope["method"], route, stats.count, app_config.QUERY_BUDGET, stats.seconds * 1000
+            )
+        repeated = stats.most_repeated()
+        if repeated is not None and repeated[1] >= app_config.QUERY_REPEAT_THRESHOLD:
+            statement, times = repeated
+            logger.warning(
+                "%s %s ran the same SQL statement %d times, likely an N+1 query: %s",
+                scope["method"], route, times, " ".join(statement.split())[:200]
+            )
@@ -0,0 +1,18 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core's serializer, without validation.
+
+    Returning it from a route bypasses the response_model check, so only
+    use it for data already shaped like the declared model, such as rows
+    selected by the columns of a read schema. Bytes are sent as they are,
+    for JSON that was serialized (or cached) earlier.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
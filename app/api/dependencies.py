@@ -1,21 +1,59 @@
-from typing import Annotated
+from hashlib import sha256
+from hmac import compare_digest
+from math import ceil
+from typing import Annotated, AsyncGenerator
 from uuid import UUID
 from app.database.models import StoreManager
 
-from app.database.redis import is_token_blacklisted
+from app.database.redis import forget_rate_limit_hit, get_store_version, hit_rate_limits, is_token_blacklisted
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.core.etag import StoreETag
 from app.api.core.security import AccessTokenBearer, oauth2_scheme
+from app.services.analytics import AnalyticsService
 from app.services.item import ItemService
+from app.services.item_import import ItemImportService
 from app.services.store import StoreService
 from app.services.store_inventory import StoreInventoryService
-from app.database.session import get_session
-from fastapi import Depends, HTTPException
+from app.database.session import async_session_maker, can_read_from_replica, mark_recent_write
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security.utils import get_authorization_scheme_param
 from http import HTTPStatus
 
-from app.services.store_manager import StoreManagerService
+from app.services.store_manager import StoreManagerService, cache_manager, get_cached_manager, manager_cache
 from app.utils import decode_access_token
+from config import app_config, security_config
 
-SessionDep = Annotated[AsyncSession, Depends(get_session)]
+async def get_routed_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # Only routing depends on the token here; it is fully verified by get_current_manager
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    claims = decode_access_token(token) if scheme.lower() == "bearer" and token else None
+    manager_id = UUID(claims["id"]) if claims is not None else None
+
+    async with async_session_maker() as session:
+        if request.method in ("GET", "HEAD"):
+            session.info["replica"] = can_read_from_replica(*_routing_keys(manager_id))
+            yield session
+            return
+
+        # Marked before and after, so the window covers the whole request plus the replica catching up
+        if manager_id is not None:
+            await mark_recent_write(manager_id)
+        yield session
+        if manager_id is not None:
+            await mark_recent_write(manager_id)
+
+def _routing_keys(manager_id: UUID | None) -> tuple[UUID | None, ...]:
+    if manager_id is None:
+        return ()
+    snapshot = manager_cache.peek(manager_id)
+    if snapshot is None:
+        # Store unknown until the manager is loaded, so stay on the primary
+        return (None,)
+    return (manager_id, snapshot["store_id"]) if snapshot["store_id"] is not None else (manager_id,)
+
+SessionDep = Annotated[AsyncSession, Depends(get_routed_session)]
 AccessTokenDep = Annotated[str, Depends(oauth2_scheme)]
 
 async def get_access_token_data(token: AccessTokenDep) -> dict[str, str | int]:
@@ -26,14 +64,85 @@ async def get_access_token_data(token: AccessTokenDep) -> dict[str, str | int]:
 
 async def get_current_manager(token: AccessTokenDep, session: SessionDep) -> StoreManager:
     result = await get_access_token_data(token)
-    manager = await session.get(StoreManager, UUID(result["id"]))
+    manager_id = UUID(result["id"])
+    manager = get_cached_manager(manager_id)
+    if manager is not None:
+        return manager
+
+    generation = manager_cache.generation
+    manager = await session.get(StoreManager, manager_id)
     if manager is None:
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Invalid token")
+    cache_manager(manager, generation)
     return manager
 
+async def get_store_etag(
+    manager: Annotated[StoreManager, Depends(get_current_manager)],
+    if_none_match: Annotated[str | None, Header()] = None
+) -> StoreETag:
+    if manager.store_id is None:
+        return StoreETag(None, if_none_match)
+    try:
+        version = await get_store_version(str(manager.store_id), app_config.STORE_VERSION_TTL_SECONDS)
+    except RedisError:
+        # Without a trustworthy version, skip conditional responses altogether
+        return StoreETag(None, if_none_match)
+    return StoreETag(f'W/"{manager.store_id}-{version}"', if_none_match)
+
+async def limit_login_attempts(
+    request: Request,
+    form: Annotated[OAuth2PasswordRequestForm, Depends()]
+) -> AsyncGenerator[None, None]:
+    # Runs before the session and bcrypt, so rejected attempts cost one Redis call. The attempt is reserved
+    # under every key before the password is checked, so concurrent attempts can't overrun a limit; a
+    # successful login then gives its email slot back, so the owner's own logins never lock the email
+    limits = {}
+    email_key = None
+    if security_config.LOGIN_RATE_LIMIT_PER_EMAIL > 0:
+        email_key = f"login:email:{sha256(form.username.strip().lower().encode()).hexdigest()}"
+        limits[email_key] = (
+            security_config.LOGIN_RATE_LIMIT_PER_EMAIL, security_config.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+        )
+    if security_config.LOGIN_RATE_LIMIT_PER_IP > 0 and request.client is not None:
+        limits[f"login:ip:{request.client.host}"] = (
+            security_config.LOGIN_RATE_LIMIT_PER_IP, security_config.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+        )
+
+    wait, attempt = 0, None
+    if limits:
+        try:
+            wait, attempt = await hit_rate_limits(limits)
+        except RedisError:
+            # Fail open: the bcrypt pool's queue limit still caps how much CPU logins can take
+            pass
+    if wait > 0:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(ceil(wait))}
+        )
+
+    yield
+
+    if email_key is not None and attempt is not None:
+        try:
+            await forget_rate_limit_hit(email_key, attempt)
+        except RedisError:
+            # The slot frees itself when the window passes
+            pass
+
+async def require_internal_token(x_internal_token: Annotated[str | None, Header()] = None) -> None:
+    # 404 rather than 401, so the routes don't advertise themselves
+    expected = security_config.INTERNAL_API_TOKEN
+    if not expected or x_internal_token is None or not compare_digest(x_internal_token, expected):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Not Found")
+
 def get_item_service(session: SessionDep) -> ItemService:
     return ItemService(session)
 
+def get_item_import_service(session: SessionDep) -> ItemImportService:
+    return ItemImportService(session)
+
 def get_store_service(session: SessionDep) -> StoreService:
     return StoreService(session)
 
@@ -43,8 +152,14 @@ def get_store_inventory_service(session: SessionDep) -> StoreInventoryService:
 def get_store_manager_service(session: SessionDep) -> StoreManagerService:
     return StoreManagerService(session)
 
+def get_analytics_service(session: SessionDep) -> AnalyticsService:
+    return AnalyticsService(session)
+
 ItemServiceDep = Annotated[ItemService, Depends(get_item_service)]
+ItemImportServiceDep = Annotated[ItemImportService, Depends(get_item_import_service)]
 StoreServiceDep = Annotated[StoreService, Depends(get_store_service)]
 StoreInventoryServiceDep = Annotated[StoreInventoryService, Depends(get_store_inventory_service)]
 StoreManagerServiceDep = Annotated[StoreManagerService, Depends(get_store_manager_service)]
+AnalyticsServiceDep = Annotated[AnalyticsService, Depends(get_analytics_service)]
 StoreManagerDep = Annotated[StoreManager, Depends(get_current_manager)]
+StoreETagDep = Annotated[StoreETag, Depends(get_store_etag)]
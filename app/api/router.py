@@ -1,8 +1,10 @@
-from app.api.routers import item, store_manager, store, store_inventory
+from app.api.routers import analytics, internal, item, store_manager, store, store_inventory
 from fastapi import APIRouter
 
 master_router = APIRouter()
 master_router.include_router(item.router)
 master_router.include_router(store.router)
 master_router.include_router(store_inventory.router)
-master_router.include_router(store_manager.router)
\ No newline at end of file
+master_router.include_router(store_manager.router)
+master_router.include_router(analytics.router)
+master_router.include_router(internal.router)
\ No newline at end of file
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Query
+from app.api.dependencies import AnalyticsServiceDep, StoreManagerDep
+from app.api.schemas.analytics import InventoryValuation, ValuationGroupBy
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/inventory-valuation", response_model=InventoryValuation)
+async def get_inventory_valuation(
+    service: AnalyticsServiceDep,
+    manager: StoreManagerDep,
+    group_by: list[ValuationGroupBy] = Query(
+        default=[ValuationGroupBy.CATEGORY, ValuationGroupBy.REGION],
+        description="Dimensions to group the store's items by"
+    )
+) -> InventoryValuation:
+    return await service.inventory_valuation(manager, group_by)
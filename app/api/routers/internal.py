@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+
+from app.api.dependencies import require_internal_token
+from app.database.redis import token_blacklist_mirror
+from app.database.session import get_engine, get_replica_engine, recent_writes, replica_state
+from app.services.item import item_cache
+from app.services.store_manager import manager_cache
+from app.startup import startup_timings
+from app.utils import token_cache
+
+# Operator-only: hidden from the OpenAPI schema and gated by INTERNAL_API_TOKEN
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)]
+)
+
+
+@router.get("/caches")
+async def get_cache_stats() -> dict[str, dict[str, int | float]]:
+    return {
+        "access_tokens": token_cache.stats(),
+        "managers": manager_cache.stats(),
+        "items": item_cache.stats(),
+        "token_blacklist": {"size": len(token_blacklist_mirror), "synced": int(token_blacklist_mirror.synced)},
+        "replica_recent_writes": recent_writes.stats(),
+    }
+
+
+@router.get("/replica")
+async def get_replica_state() -> dict[str, int | float | None]:
+    return replica_state.stats()
+
+
+@router.get("/pool")
+async def get_pool_stats() -> dict[str, dict[str, int | float]]:
+    stats = {"primary": get_engine().pool.stats()}
+    replica_engine = get_replica_engine()
+    if replica_engine is not None:
+        stats["replica"] = replica_engine.pool.stats()
+    return stats
+
+
+@router.get("/startup")
+async def get_startup_timings() -> dict[str, float]:
+    return startup_timings
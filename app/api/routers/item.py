@@ -1,20 +1,49 @@
+from typing import Annotated, AsyncIterator
 from uuid import UUID
-from fastapi import APIRouter, HTTPException
-from app.api.dependencies import SessionDep, ItemServiceDep, StoreManagerDep
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from app.api.core.responses import FastJSONResponse
+from app.api.dependencies import SessionDep, ItemServiceDep, ItemImportServiceDep, StoreETagDep, StoreManagerDep
 from app.database.models import Item
-from app.api.schemas.item import ItemCreate, ItemUpdate
+from app.api.schemas.item import ItemCreate, ItemImportResult, ItemPage, ItemQuery, ItemRead, ItemUpdate
+from config import app_config
 
 router = APIRouter(prefix="/items", tags=["items"])
 
-@router.get("/{id}", response_model=Item)
-async def get_item(id: UUID, service: ItemServiceDep, manager: StoreManagerDep) -> Item:
-    return await service.get(id, manager)
+@router.get("/export", response_class=StreamingResponse)
+async def export_items(service: ItemServiceDep, manager: StoreManagerDep) -> StreamingResponse:
+    batches = service.stream_all(manager)
 
+    async def ndjson() -> AsyncIterator[bytes]:
+        async for batch in batches:
+            yield b"".join(to_json(row) + b"\n" for row in batch)
 
-@router.get("/", response_model=dict[UUID, Item])
-async def get_items(service: ItemServiceDep, manager: StoreManagerDep) -> dict[UUID, Item]:
-    items = await service.get_all(manager)
-    return {item.id: item for item in items}
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/{id}", response_model=ItemRead)
+async def get_item(id: UUID, service: ItemServiceDep, manager: StoreManagerDep, etag: StoreETagDep) -> Response:
+    # "*" would answer 304 for any ID, even one that doesn't exist or belongs to another store
+    if etag.matches_version:
+        return etag.not_modified()
+    response = FastJSONResponse(await service.read_json(id, manager))
+    etag.apply(response)
+    return response
+
+
+@router.get("/", response_model=ItemPage)
+async def get_items(
+    service: ItemServiceDep,
+    manager: StoreManagerDep,
+    etag: StoreETagDep,
+    query: Annotated[ItemQuery, Query()]
+) -> Response:
+    if etag.matches:
+        return etag.not_modified()
+    response = FastJSONResponse(await service.read_page_json(manager, query))
+    etag.apply(response)
+    return response
 
 
 @router.post("/", response_model=Item, status_code=201)
@@ -22,6 +51,25 @@ async def create_item(item: ItemCreate, service: ItemServiceDep, manager: StoreM
     return await service.add(item, manager)
 
 
+@router.post("/bulk", response_model=list[UUID], status_code=201)
+async def create_items(
+    # Capped while parsing, so validation stops at the first item past the limit
+    items: Annotated[list[ItemCreate], Body(max_length=app_config.ITEM_BULK_MAX_SIZE)],
+    service: ItemServiceDep,
+    manager: StoreManagerDep
+) -> list[UUID]:
+    return await service.add_many(items, manager)
+
+
+@router.post(
+    "/import",
+    response_model=ItemImportResult,
+    openapi_extra={"requestBody": {"required": True, "content": {"text/csv": {"schema": {"type": "string"}}}}}
+)
+async def import_items(request: Request, service: ItemImportServiceDep, manager: StoreManagerDep) -> ItemImportResult:
+    return await service.import_csv(request.stream(), manager)
+
+
 @router.patch("/{id}", response_model=Item)
 async def update_item(id: UUID, update: ItemUpdate, service: ItemServiceDep, manager: StoreManagerDep) -> Item:
     return await service.update(id, update, manager)
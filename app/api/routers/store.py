@@ -1,24 +1,43 @@
+from typing import Any
 from uuid import UUID
-from fastapi import APIRouter, HTTPException, Query
-from app.api.dependencies import StoreServiceDep, StoreManagerDep
+from fastapi import APIRouter, HTTPException, Query, Response
+from app.api.dependencies import StoreETagDep, StoreServiceDep, StoreManagerDep
 from app.database.models import Store
-from app.api.schemas.store import StoreCreate, StoreUpdate
+from app.api.schemas.store import StoreCreate, StoreRead, StoreUpdate
 
 router = APIRouter(prefix="/stores", tags=["stores"])
 
 
-@router.get("/{id}", response_model=Store)
-async def get_store(id: UUID, service: StoreServiceDep, manager: StoreManagerDep) -> Store:
-    store = await service.get(id, manager)
+@router.get("/{id}", response_model=StoreRead)
+async def get_store(
+    id: UUID,
+    response: Response,
+    service: StoreServiceDep,
+    manager: StoreManagerDep,
+    etag: StoreETagDep
+) -> dict[str, Any] | Response:
+    # Only the manager's own store is visible, so its ETag is only valid for that ID
+    if manager.store_id == id and etag.matches:
+        return etag.not_modified()
+    store = await service.read(id, manager)
     if store is None:
         raise HTTPException(status_code=404, detail="Store not found")
+    etag.apply(response)
     return store
 
 
-@router.get("/", response_model=dict[UUID, Store])
-async def get_stores(service: StoreServiceDep, manager: StoreManagerDep) -> dict[UUID, Store]:
-    stores = await service.get_all(manager)
-    return {store.id: store for store in stores}
+@router.get("/", response_model=dict[UUID, StoreRead])
+async def get_stores(
+    response: Response,
+    service: StoreServiceDep,
+    manager: StoreManagerDep,
+    etag: StoreETagDep
+) -> dict[str, Any] | Response:
+    if etag.matches:
+        return etag.not_modified()
+    etag.apply(response)
+    stores = await service.read_all(manager)
+    return {store["id"]: store for store in stores}
 
 
 @router.post("/", response_model=Store, status_code=201)
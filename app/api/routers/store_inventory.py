@@ -1,31 +1,34 @@
+from typing import Annotated, Any
 from uuid import UUID
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from app.api.dependencies import StoreInventoryServiceDep, StoreManagerDep
 from app.database.models import StoreInventory
-from app.api.schemas.store_inventory import StoreInventoryCreate, StoreInventoryUpdate
+from app.api.schemas.store_inventory import (
+    StoreInventoryCreate, StoreInventoryPage, StoreInventoryQuery, StoreInventoryRead, StoreInventoryUpdate
+)
 
 router = APIRouter(prefix="/store-inventories", tags=["store-inventories"])
 
 
-@router.get("/{id}", response_model=StoreInventory)
+@router.get("/{id}", response_model=StoreInventoryRead)
 async def get_store_inventory(
     id: UUID,
     service: StoreInventoryServiceDep,
     _: StoreManagerDep
-) -> StoreInventory:
-    inventory = await service.get(id)
+) -> dict[str, Any]:
+    inventory = await service.read(id)
     if inventory is None:
         raise HTTPException(status_code=404, detail="Store inventory not found")
     return inventory
 
 
-@router.get("/", response_model=dict[UUID, StoreInventory])
+@router.get("/", response_model=StoreInventoryPage)
 async def get_store_inventories(
     service: StoreInventoryServiceDep,
-    _: StoreManagerDep
-) -> dict[UUID, StoreInventory]:
-    inventories = await service.get_all()
-    return {inv.id: inv for inv in inventories}
+    _: StoreManagerDep,
+    query: Annotated[StoreInventoryQuery, Query()]
+) -> dict[str, Any]:
+    return await service.read_page(query)
 
 
 @router.post("/", response_model=StoreInventory, status_code=201)
@@ -3,7 +3,9 @@ from uuid import UUID
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.api.dependencies import StoreManagerServiceDep, SessionDep, StoreManagerDep, get_access_token_data
+from app.api.dependencies import (
+    StoreManagerServiceDep, SessionDep, StoreManagerDep, get_access_token_data, limit_login_attempts
+)
 from app.api.schemas.store_manager import StoreManagerCreate, StoreManagerUpdate
 from app.database.models import StoreManager
 
@@ -13,14 +15,13 @@ router = APIRouter(prefix="/store-managers", tags=["store-managers"])
 async def create_storemanager(storemanager: StoreManagerCreate, session: SessionDep, service: StoreManagerServiceDep) -> StoreManager:
     return await service.add(storemanager)
 
-@router.post("/token")
+@router.post("/token", dependencies=[Depends(limit_login_attempts)])
 async def get_access_token(request: Annotated[OAuth2PasswordRequestForm, Depends()], service: StoreManagerServiceDep) -> dict[str, str]:
     return await service.token(request.username, request.password)
 
 @router.get("/logout")
 async def logout(token_data: Annotated[dict[str, str | int], Depends(get_access_token_data)], service: StoreManagerServiceDep) -> dict[str, str]:
-    token_id = token_data["jti"]
-    await service.logout(token_id)
+    await service.logout(token_data["jti"], token_data["exp"])
     return {"message": "Logged out successfully"}
 
 @router.patch("/{id}", response_model=StoreManager)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from enum import Enum
+from uuid import UUID
+from pydantic import BaseModel
+from app.database.models import Category, Region
+
+
+class ValuationGroupBy(str, Enum):
+    CATEGORY = "category"
+    REGION = "region"
+
+
+class InventoryValuationGroup(BaseModel):
+    # A dimension that isn't grouped by is null; region is also null for items outside any inventory
+    category: Category | None = None
+    region: Region | None = None
+    item_count: int
+    in_stock_count: int
+    in_stock_ratio: float
+    stock_value_usd: float
+
+
+class InventoryValuation(BaseModel):
+    store_id: UUID
+    # When the view was last refreshed; changes made since then are not counted yet
+    refreshed_at: datetime | None
+    groups: list[InventoryValuationGroup]
@@ -1,5 +1,7 @@
+from enum import Enum
+from typing import Self
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from sqlmodel import Field
 from app.database.models import Category
 
@@ -19,3 +21,58 @@ class ItemUpdate(BaseModel):
     in_stock: bool | None = None
     store_inventory_id: UUID | None = Field(default=None, description="Update store inventory assignment")
 
+
+class ItemRead(BaseModel):
+    id: UUID
+    name: str
+    category: Category
+    price_usd: float
+    in_stock: bool
+    store_id: UUID
+    store_inventory_id: UUID | None
+
+
+class ItemSort(str, Enum):
+    ID = "id"
+    NAME = "name"
+    NAME_DESC = "-name"
+    PRICE = "price_usd"
+    PRICE_DESC = "-price_usd"
+
+
+class ItemQuery(BaseModel):
+    limit: int = Field(default=100, ge=1, le=1000, description="Maximum number of items to return")
+    cursor: str | None = Field(default=None, description="next_cursor from the previous page, with the same filters and sort")
+    category: list[Category] | None = Field(default=None, description="Only these categories; repeat to pass several")
+    min_price: float | None = Field(default=None, ge=0)
+    max_price: float | None = Field(default=None, ge=0)
+    in_stock: bool | None = None
+    q: str | None = Field(
+        default=None, min_length=1, max_length=64,
+        description="Case-insensitive name substring; 3 or more characters use the trigram index"
+    )
+    sort: ItemSort = Field(default=ItemSort.ID, description="Sort key, prefixed with - for descending order")
+
+    @model_validator(mode="after")
+    def check_price_range(self) -> Self:
+        if self.min_price is not None and self.max_price is not None and self.min_price > self.max_price:
+            raise ValueError("min_price must not be greater than max_price")
+        return self
+
+
+class ItemPage(BaseModel):
+    items: list[ItemRead]
+    next_cursor: str | None = Field(default=None, description="Cursor for the next page, null on the last page")
+
+
+class ItemImportError(BaseModel):
+    row: int = Field(description="1-based data row in the CSV, not counting the header")
+    error: str
+
+
+class ItemImportResult(BaseModel):
+    imported: int
+    rejected: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: list[ItemImportError] = Field(description="First rejected rows in file order, capped by ITEM_IMPORT_MAX_REPORTED_ERRORS")
@@ -1,3 +1,4 @@
+from uuid import UUID
 from pydantic import BaseModel
 from sqlmodel import Field
 
@@ -10,3 +11,12 @@ class StoreCreate(BaseModel):
 class StoreUpdate(BaseModel):
     name: str | None = Field(default=None, max_length=64)
     location: str | None = Field(default=None, max_length=128)
+
+
+class StoreRead(BaseModel):
+    id: UUID
+    name: str
+    location: str
+    item_count: int
+    in_stock_count: int
+    total_price_usd: float
@@ -1,3 +1,4 @@
+from uuid import UUID
 from pydantic import BaseModel
 from sqlmodel import Field
 from app.database.models import Region
@@ -11,3 +12,23 @@ class StoreInventoryCreate(BaseModel):
 class StoreInventoryUpdate(BaseModel):
     name: str | None = Field(default=None, max_length=64)
     region: Region | None = None
+
+
+class StoreInventoryRead(BaseModel):
+    id: UUID
+    name: str
+    region: Region
+    item_count: int
+    in_stock_count: int
+    total_price_usd: float
+
+
+class StoreInventoryQuery(BaseModel):
+    limit: int = Field(default=100, ge=1, le=1000, description="Maximum number of store inventories to return")
+    cursor: str | None = Field(default=None, description="next_cursor from the previous page, with the same filters")
+    region: list[Region] | None = Field(default=None, description="Only these regions; repeat to pass several")
+
+
+class StoreInventoryPage(BaseModel):
+    items: list[StoreInventoryRead]
+    next_cursor: str | None = Field(default=None, description="Cursor for the next page, null on the last page")
@@ -1,7 +1,9 @@
+from datetime import datetime
 from enum import Enum
 from typing import Optional
 from pydantic import EmailStr
 from sqlmodel import Column, Relationship, SQLModel, Field
+from sqlalchemy import DDL, BigInteger, DateTime, ForeignKey, Index, Integer, Numeric, Uuid, column, event, func, table, text
 from uuid import UUID, uuid4
 from sqlalchemy.dialects import postgresql
 
@@ -32,6 +34,17 @@ class Region(str, Enum):
 
 class Item(SQLModel, table=True):
     __tablename__ = "items"
+    __table_args__ = (
+        # Keyset pagination walks a store's items in (store_id, id) order, or (store_id, sort column, id)
+        Index("ix_items_store_id_id", "store_id", "id"),
+        Index("ix_items_store_id_name_id", "store_id", "name", "id"),
+        Index("ix_items_store_id_price_usd_id", "store_id", "price_usd", "id"),
+        Index("ix_items_store_id_category_id", "store_id", "category", "id"),
+        # Out-of-stock items are the minority that gets filtered for, so only they are indexed
+        Index("ix_items_store_id_id_out_of_stock", "store_id", "id", postgresql_where=text("NOT in_stock")),
+        # Name substring search (ILIKE '%...%')
+        Index("ix_items_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id: UUID | None = Field(
             default_factory=uuid4,
@@ -53,6 +66,10 @@ class Item(SQLModel, table=True):
     store_inventory: Optional["StoreInventory"] = Relationship(back_populates="items")
 
 
+# gin_trgm_ops comes from pg_trgm, which has to exist before create_all builds the items indexes
+event.listen(Item.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
 class Store(SQLModel, table=True):
     __tablename__ = "stores"
 
@@ -92,6 +109,10 @@ class StoreManager(SQLModel, table=True):
 
 class StoreInventory(SQLModel, table=True):
     __tablename__ = "store_inventories"
+    __table_args__ = (
+        # Keyset pagination of the inventories in a region
+        Index("ix_store_inventories_region_id", "region", "id"),
+    )
 
     id: UUID | None = Field(
         default_factory=uuid4,
@@ -104,4 +125,179 @@ class StoreInventory(SQLModel, table=True):
     name: str = Field(max_length=64)
     region: Region
 
-    items: list[Item] = Relationship(back_populates="store_inventory")
\ No newline at end of file
+    items: list[Item] = Relationship(back_populates="store_inventory")
+
+
+
+class ItemStats(SQLModel):
+    """Item counters kept current by the triggers on items (see ITEM_STATS_FUNCTION)."""
+    item_count: int = Field(default=0, sa_type=BigInteger)
+    in_stock_count: int = Field(default=0, sa_type=BigInteger)
+    # numeric, so adding and subtracting prices forever doesn't drift
+    total_price_usd: float = Field(default=0, sa_type=Numeric(asdecimal=False))
+
+    @classmethod
+    def read_columns(cls) -> tuple:
+        # For an outer join: a missing row means no items
+        return (
+            func.coalesce(cls.item_count, 0).label("item_count"),
+            func.coalesce(cls.in_stock_count, 0).label("in_stock_count"),
+            func.coalesce(cls.total_price_usd, 0).label("total_price_usd"),
+        )
+
+
+class StoreItemStats(ItemStats, table=True):
+    __tablename__ = "store_item_stats"
+
+    store_id: UUID = Field(
+        sa_column=Column[UUID](ForeignKey("stores.id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    )
+
+
+class StoreInventoryItemStats(ItemStats, table=True):
+    __tablename__ = "store_inventory_item_stats"
+
+    store_inventory_id: UUID = Field(
+        sa_column=Column[UUID](ForeignKey("store_inventories.id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    )
+
+
+# Statement-level, so a bulk insert or an import adds one delta per store instead of one per row.
+# Transition tables can't be shared between events, hence one branch per operation
+_ITEM_STATS_APPLY = """
+        WITH changes AS ({changes}),
+        store_stats AS (
+            INSERT INTO store_item_stats AS s (store_id, item_count, in_stock_count, total_price_usd)
+            SELECT store_id, sum(sign), coalesce(sum(sign) FILTER (WHERE in_stock), 0), sum(sign * price_usd::numeric)
+            FROM changes
+            GROUP BY store_id
+            ORDER BY store_id
+            ON CONFLICT (store_id) DO UPDATE SET
+                item_count = s.item_count + excluded.item_count,
+                in_stock_count = s.in_stock_count + excluded.in_stock_count,
+                total_price_usd = s.total_price_usd + excluded.total_price_usd
+        )
+        INSERT INTO store_inventory_item_stats AS s (store_inventory_id, item_count, in_stock_count, total_price_usd)
+        SELECT store_inventory_id, sum(sign), coalesce(sum(sign) FILTER (WHERE in_stock), 0), sum(sign * price_usd::numeric)
+        FROM changes
+        WHERE store_inventory_id IS NOT NULL
+        GROUP BY store_inventory_id
+        ORDER BY store_inventory_id
+        ON CONFLICT (store_inventory_id) DO UPDATE SET
+            item_count = s.item_count + excluded.item_count,
+            in_stock_count = s.in_stock_count + excluded.in_stock_count,
+            total_price_usd = s.total_price_usd + excluded.total_price_usd;"""
+
+ITEM_STATS_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION items_maintain_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN{_ITEM_STATS_APPLY.format(changes="""
+            SELECT store_id, store_inventory_id, in_stock, price_usd, 1 AS sign FROM new_items
+        """)}
+    ELSIF TG_OP = 'UPDATE' THEN{_ITEM_STATS_APPLY.format(changes="""
+            SELECT c.* FROM old_items o JOIN new_items n USING (id)
+            CROSS JOIN LATERAL (VALUES
+                (o.store_id, o.store_inventory_id, o.in_stock, o.price_usd, -1),
+                (n.store_id, n.store_inventory_id, n.in_stock, n.price_usd, 1)
+            ) AS c(store_id, store_inventory_id, in_stock, price_usd, sign)
+            WHERE (o.store_id, o.store_inventory_id, o.in_stock, o.price_usd)
+                IS DISTINCT FROM (n.store_id, n.store_inventory_id, n.in_stock, n.price_usd)
+        """)}
+    ELSE{_ITEM_STATS_APPLY.format(changes="""
+            SELECT store_id, store_inventory_id, in_stock, price_usd, -1 AS sign FROM old_items
+        """)}
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+ITEM_STATS_TRIGGERS = tuple(
+    f"CREATE OR REPLACE TRIGGER items_stats_{operation.lower()} AFTER {operation} ON items "
+    f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION items_maintain_stats()"
+    for operation, transition in (
+        ("INSERT", "NEW TABLE AS new_items"),
+        ("UPDATE", "OLD TABLE AS old_items NEW TABLE AS new_items"),
+        ("DELETE", "OLD TABLE AS old_items"),
+    )
+)
+
+# Seeds the counters for items written before the triggers existed
+ITEM_STATS_BACKFILL = (
+    """
+    INSERT INTO store_item_stats (store_id, item_count, in_stock_count, total_price_usd)
+    SELECT store_id, count(*), count(*) FILTER (WHERE in_stock), coalesce(sum(price_usd::numeric), 0)
+    FROM items
+    WHERE NOT EXISTS (SELECT 1 FROM store_item_stats)
+    GROUP BY store_id
+    """,
+    """
+    INSERT INTO store_inventory_item_stats (store_inventory_id, item_count, in_stock_count, total_price_usd)
+    SELECT store_inventory_id, count(*), count(*) FILTER (WHERE in_stock), coalesce(sum(price_usd::numeric), 0)
+    FROM items
+    WHERE store_inventory_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM store_inventory_item_stats)
+    GROUP BY store_inventory_id
+    """,
+)
+
+class MaterializedViewRefresh(SQLModel, table=True):
+    """When each materialized view was last refreshed; PostgreSQL doesn't record it."""
+    __tablename__ = "materialized_view_refreshes"
+
+    name: str = Field(primary_key=True, max_length=64)
+    refreshed_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
+# Stock value and counts per store, category and inventory region. region_key is the region with
+# NULL (items outside any inventory) spelled as '', so the unique index REFRESH CONCURRENTLY needs covers every row
+INVENTORY_VALUATION_VIEW = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS inventory_valuation AS
+SELECT
+    i.store_id,
+    s.name AS store_name,
+    i.category,
+    si.region,
+    coalesce(si.region::text, '') AS region_key,
+    count(*) AS item_count,
+    count(*) FILTER (WHERE i.in_stock) AS in_stock_count,
+    coalesce(sum(i.price_usd) FILTER (WHERE i.in_stock), 0) AS stock_value_usd
+FROM items i
+JOIN stores s ON s.id = i.store_id
+LEFT JOIN store_inventories si ON si.id = i.store_inventory_id
+GROUP BY i.store_id, s.name, i.category, si.region
+"""
+
+# Not part of the metadata, so create_all doesn't try to create it as a table
+inventory_valuation = table(
+    "inventory_valuation",
+    column("store_id", Uuid),
+    column("store_name"),
+    column("category", Item.__table__.c.category.type),
+    column("region", StoreInventory.__table__.c.region.type),
+    column("item_count", Integer),
+    column("in_stock_count", Integer),
+    column("stock_value_usd"),
+)
+
+
+def _run_after_create(statements: tuple[str, ...], *models: type[SQLModel]) -> None:
+    names = {model.__tablename__ for model in models}
+
+    def run(target, connection, tables=(), **kw) -> None:
+        # create_all passes the tables it actually created, so an existing schema is left alone
+        if any(table.name in names for table in tables):
+            for statement in statements:
+                connection.execute(DDL(statement))
+
+    event.listen(SQLModel.metadata, "after_create", run)
+
+_run_after_create((ITEM_STATS_FUNCTION, *ITEM_STATS_TRIGGERS, *ITEM_STATS_BACKFILL), StoreItemStats, StoreInventoryItemStats)
+_run_after_create(
+    (
+        INVENTORY_VALUATION_VIEW,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_inventory_valuation ON inventory_valuation (store_id, category, region_key)",
+        "INSERT INTO materialized_view_refreshes (name, refreshed_at) VALUES ('inventory_valuation', now()) "
+        "ON CONFLICT (name) DO NOTHING",
+    ),
+    MaterializedViewRefresh
+)
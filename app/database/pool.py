@@ -0,0 +1,45 @@
+from time import perf_counter
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long checkouts take and how often they time out.
+
+    A checkout includes waiting for a free connection, opening a new one when
+    the pool may still overflow, and the pre-ping, so long checkouts point at
+    pool starvation or a slow database.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def connect(self):
+        started = perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = perf_counter() - started
+            self.checkouts += 1
+            self.checkout_seconds += elapsed
+            self.max_checkout_seconds = max(self.max_checkout_seconds, elapsed)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "timeout_seconds": self.timeout(),
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.timeouts,
+            "checkout_seconds_total": self.checkout_seconds,
+            "checkout_seconds_max": self.max_checkout_seconds,
+        }
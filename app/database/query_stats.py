@@ -0,0 +1,36 @@
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryStats:
+    """SQL statements run on behalf of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Keyed by the SQL text, which is the same for every execution of a statement with different parameters
+        self.shapes: Counter[str] = Counter()
+
+    def most_repeated(self) -> tuple[str, int] | None:
+        return self.shapes.most_common(1)[0] if self.shapes else None
+
+
+# Set per request by QueryStatsMiddleware; SQLAlchemy runs its events in the caller's context
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+def track_queries(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_stats_started = perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_query_stats.get()
+        if stats is None:
+            return
+        stats.count += 1
+        stats.seconds += perf_counter() - context._query_stats_started
+        stats.shapes[statement] += 1
@@ -1,23 +1,337 @@
-import json
-from datetime import datetime, timedelta, timezone
-from redis.asyncio import Redis
-from config import db_config
-
-_token_blacklist_conn = Redis(
-    host=db_config.REDIS_HOST,
-    port=db_config.REDIS_PORT,
-    db=db_config.REDIS_DB,
-)
+import asyncio
+import logging
+from functools import cache
+from math import ceil
+from time import time, time_ns
+from typing import Awaitable, Callable, Mapping, Sequence
+from uuid import uuid4
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+from app.metrics import timed_redis
+from config import db_config, security_config
+
+logger = logging.getLogger(__name__)
+
+MANAGER_INVALIDATION_CHANNEL = "store-managers:invalidate"
+TOKEN_BLACKLIST_CHANNEL = "token-blacklist:add"
+RECENT_WRITES_CHANNEL = "replica:recent-writes"
+
+TOKEN_BLACKLIST_PREFIX = "blacklist:jti:"
+STORE_VERSION_PREFIX = "store-version:"
+RATE_LIMIT_PREFIX = "rate-limit:"
+
+_redis: Redis | None = None
+
+def get_redis() -> Redis:
+    # Built on first use rather than at import, like the database engines
+    global _redis
+    if _redis is None:
+        # Waits up to REDIS_POOL_TIMEOUT for a free connection instead of failing once the pool is full
+        _redis = Redis(connection_pool=BlockingConnectionPool(
+            host=db_config.REDIS_HOST,
+            port=db_config.REDIS_PORT,
+            db=db_config.REDIS_DB,
+            max_connections=db_config.REDIS_MAX_CONNECTIONS,
+            timeout=db_config.REDIS_POOL_TIMEOUT,
+            socket_timeout=db_config.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=db_config.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=10,
+        ))
+    return _redis
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose(close_connection_pool=True)
+        _redis = None
+        _script.cache_clear()
+
+@cache
+def _script(source: str) -> AsyncScript:
+    return get_redis().register_script(source)
+
+# Sets a hash field only if the hash generation still matches the one read before loading the value,
+# so a rebuild that raced with an invalidation can't put stale data back
+_HSET_IF_GENERATION = """
+local current = redis.call('HGET', KEYS[1], '_generation') or ''
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return 1
+"""
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Sliding-window log per key: a sorted set of attempt timestamps (ms, Redis clock). The attempt is recorded
+# under every key only if none of them is full, otherwise returns the ms until the fullest window frees a slot
+_SLIDING_WINDOW = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        wait = math.max(wait, tonumber(oldest[2]) + window - now)
+    end
+end
+if wait > 0 then
+    return wait
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, ARGV[2 * i + 1])
+end
+return 0
+"""
+
+_channel_handlers: dict[str, Callable[[str], None]] = {}
+_resync_handlers: list[Callable[[], Awaitable[None] | None]] = []
+_disconnect_handlers: list[Callable[[], None]] = []
+
+
+class TokenBlacklistMirror:
+    """Per-worker copy of the Redis token blacklist, kept current over pub/sub.
+
+    Only logged-out tokens that have not expired yet are held, so an exact
+    map of jti to expiry stays small enough without a probabilistic filter.
+    """
+
+    def __init__(self):
+        # True while subscribed and fully loaded; until then Redis stays the source of truth
+        self.synced = False
+        self._expiries: dict[str, float] = {}
+        self._purge_at = 1024
+
+    def __contains__(self, token_id: str) -> bool:
+        expiry = self._expiries.get(token_id)
+        if expiry is None:
+            return False
+        if expiry <= time():
+            del self._expiries[token_id]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def add(self, token_id: str, expires_at: float) -> None:
+        self._expiries[token_id] = expires_at
+        if len(self._expiries) >= self._purge_at:
+            self.purge()
+
+    def purge(self) -> None:
+        now = time()
+        self._expiries = {token_id: expiry for token_id, expiry in self._expiries.items() if expiry > now}
+        self._purge_at = max(1024, 2 * len(self._expiries))
+
+
+token_blacklist_mirror = TokenBlacklistMirror()
+
+def _blacklist_key(token_id: str) -> str:
+    return f"{TOKEN_BLACKLIST_PREFIX}{token_id}"
+
+async def add_to_token_blacklist(token_id: str, expires_at: int) -> None:
+    await add_many_to_token_blacklist({token_id: expires_at})
+
+@timed_redis
+async def add_many_to_token_blacklist(tokens: Mapping[str, int]) -> None:
+    # Entries only need to outlive the token they block, so each one expires with its token
+    now = time()
+    live = {token_id: expires_at for token_id, expires_at in tokens.items() if expires_at > now}
+    if not live:
+        return
+
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for token_id, expires_at in live.items():
+            pipe.set(_blacklist_key(token_id), 1, ex=ceil(expires_at - now))
+            pipe.publish(TOKEN_BLACKLIST_CHANNEL, f"{token_id} {expires_at}")
+        await pipe.execute()
 
-async def add_to_token_blacklist(token_id: str) -> None:
-    now = datetime.now(timezone.utc).isoformat()
-    blacklist_data = {
-        "jti": token_id,
-        "status": "blacklisted",
-        "created_at": now,
-        "updated_at": now
-    }
-    await _token_blacklist_conn.set(token_id, json.dumps(blacklist_data), ex=timedelta(days=1))
+    for token_id, expires_at in live.items():
+        token_blacklist_mirror.add(token_id, expires_at)
 
 async def is_token_blacklisted(token_id: str) -> bool:
-    return await _token_blacklist_conn.exists(token_id)
\ No newline at end of file
+    return (await are_tokens_blacklisted([token_id]))[0]
+
+async def are_tokens_blacklisted(token_ids: Sequence[str]) -> list[bool]:
+    if token_blacklist_mirror.synced:
+        return [token_id in token_blacklist_mirror for token_id in token_ids]
+
+    try:
+        found = await _blacklist_lookup(token_ids)
+    except RedisError:
+        # The mirror may be missing recent logouts, so the configured policy decides
+        fail_closed = security_config.TOKEN_BLACKLIST_FAILURE_POLICY == "closed"
+        return [fail_closed or token_id in token_blacklist_mirror for token_id in token_ids]
+
+    return [bool(exists) or token_id in token_blacklist_mirror for token_id, exists in zip(token_ids, found)]
+
+@timed_redis
+async def _blacklist_lookup(token_ids: Sequence[str]) -> list[int]:
+    # Split out so only actual Redis round trips are timed, and their errors counted
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for token_id in token_ids:
+            pipe.exists(_blacklist_key(token_id))
+        return await pipe.execute()
+
+@timed_redis
+async def cache_get(key: str, field: str) -> tuple[bytes | None, str]:
+    value, generation = await get_redis().hmget(key, [field, "_generation"])
+    return value, (generation or b"").decode()
+
+@timed_redis
+async def cache_set(key: str, field: str, value: bytes, generation: str, ttl: int) -> bool:
+    return bool(await _script(_HSET_IF_GENERATION)(keys=[key], args=[generation, field, value, ttl]))
+
+@timed_redis
+async def cache_invalidate(key: str, ttl: int) -> None:
+    # A fresh generation makes rebuilds that started before this point discard their result
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        pipe.hset(key, "_generation", uuid4().hex)
+        pipe.expire(key, ttl)
+        await pipe.execute()
+
+@timed_redis
+async def get_store_version(store_id: str, ttl: int) -> int:
+    # Seeded from the clock, so a counter that expired or was lost never repeats an old version
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.set(f"{STORE_VERSION_PREFIX}{store_id}", time_ns(), nx=True, ex=ttl)
+        pipe.get(f"{STORE_VERSION_PREFIX}{store_id}")
+        _, version = await pipe.execute()
+    return int(version)
+
+@timed_redis
+async def bump_store_version(store_id: str, ttl: int) -> None:
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.incr(f"{STORE_VERSION_PREFIX}{store_id}")
+        pipe.expire(f"{STORE_VERSION_PREFIX}{store_id}", ttl)
+        await pipe.execute()
+
+@timed_redis
+async def acquire_lock(key: str, timeout: float) -> str | None:
+    token = uuid4().hex
+    if await get_redis().set(key, token, nx=True, px=int(timeout * 1000)):
+        return token
+    return None
+
+@timed_redis
+async def release_lock(key: str, token: str) -> None:
+    await _script(_RELEASE_LOCK)(keys=[key], args=[token])
+
+@timed_redis
+async def hit_rate_limits(limits: Mapping[str, tuple[int, float]]) -> tuple[float, str]:
+    # limits maps each key to (attempts, window seconds). Returns 0 and the id the attempt was recorded
+    # under in every key if it is allowed, otherwise the seconds until it would be
+    attempt = uuid4().hex
+    args = [attempt]
+    for limit, window in limits.values():
+        args += [limit, int(window * 1000)]
+    wait = await _script(_SLIDING_WINDOW)(
+        keys=[f"{RATE_LIMIT_PREFIX}{key}" for key in limits], args=args
+    )
+    return wait / 1000, attempt
+
+@timed_redis
+async def forget_rate_limit_hit(key: str, attempt: str) -> None:
+    # Gives back an attempt recorded by hit_rate_limits, e.g. one that turned out to be legitimate
+    await get_redis().zrem(f"{RATE_LIMIT_PREFIX}{key}", attempt)
+
+def subscribe(
+    channel: str,
+    handler: Callable[[str], None],
+    on_resync: Callable[[], Awaitable[None] | None] | None = None,
+    on_disconnect: Callable[[], None] | None = None
+) -> None:
+    # on_resync runs whenever the subscription is (re)established, since messages sent while
+    # disconnected are lost and local state must not rely on them
+    _channel_handlers[channel] = handler
+    if on_resync is not None:
+        _resync_handlers.append(on_resync)
+    if on_disconnect is not None:
+        _disconnect_handlers.append(on_disconnect)
+
+@timed_redis
+async def publish(channel: str, message: str) -> None:
+    await get_redis().publish(channel, message)
+
+async def listen() -> None:
+    while True:
+        try:
+            async with get_redis().pubsub() as pubsub:
+                await pubsub.subscribe(*_channel_handlers)
+                for resync in _resync_handlers:
+                    try:
+                        result = resync()
+                        if result is not None:
+                            await result
+                    except RedisError:
+                        raise
+                    except Exception:
+                        logger.exception("Resync handler %s failed", resync.__qualname__)
+
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    # A failing handler must not end the listener, or every later invalidation is lost
+                    try:
+                        _channel_handlers[message["channel"].decode()](message["data"].decode())
+                    except Exception:
+                        logger.exception("Handling a message on %r failed", message["channel"])
+        except RedisError:
+            pass
+        except Exception:
+            logger.exception("Redis listener failed, reconnecting")
+        finally:
+            for disconnect in _disconnect_handlers:
+                disconnect()
+        await asyncio.sleep(1)
+
+async def _load_token_blacklist() -> None:
+    # Subscribed before loading, so logouts that land during the scan still arrive as messages
+    keys = [key async for key in get_redis().scan_iter(match=f"{TOKEN_BLACKLIST_PREFIX}*", count=1000)]
+
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.ttl(key)
+        ttls = await pipe.execute()
+
+    now = time()
+    for key, ttl in zip(keys, ttls):
+        if ttl > 0:
+            token_id = key.decode(errors="replace").removeprefix(TOKEN_BLACKLIST_PREFIX)
+            token_blacklist_mirror.add(token_id, now + ttl)
+
+    token_blacklist_mirror.purge()
+    token_blacklist_mirror.synced = True
+
+def _on_token_blacklisted(message: str) -> None:
+    token_id, _, expires_at = message.rpartition(" ")
+    try:
+        token_blacklist_mirror.add(token_id, float(expires_at))
+    except ValueError:
+        pass
+
+def _on_token_blacklist_disconnect() -> None:
+    token_blacklist_mirror.synced = False
+
+subscribe(
+    TOKEN_BLACKLIST_CHANNEL,
+    _on_token_blacklisted,
+    on_resync=_load_token_blacklist,
+    on_disconnect=_on_token_blacklist_disconnect
+)
@@ -1,27 +1,216 @@
-
+import asyncio
+import logging
+from pathlib import Path
+from time import monotonic
 from typing import AsyncGenerator
+from uuid import UUID
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from alembic.config import Config as AlembicConfig
+from alembic.script import ScriptDirectory
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 
-from config import db_config
+from app.cache import TTLCache
+from app.database.pool import InstrumentedPool
+from app.database.query_stats import track_queries
+from app.metrics import instrument_engine
+from app.database.redis import RECENT_WRITES_CHANNEL, publish, subscribe
+from config import app_config, db_config, engine_profile
 from sqlmodel import SQLModel
 
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
 
-engine = create_async_engine(
-    url=db_config.POSTGRES_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=5,
-    max_overflow=10,
-    echo=True  # Set to True for SQL debugging
+
+def _create_engine(url: str, name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url=url,
+        poolclass=InstrumentedPool,
+        pool_pre_ping=True,  # Verify connections before using
+        pool_size=engine_profile.pool_size,
+        max_overflow=engine_profile.max_overflow,
+        pool_timeout=engine_profile.pool_timeout,
+        pool_recycle=engine_profile.pool_recycle,
+        echo=engine_profile.echo,
+        connect_args={
+            "prepare_threshold": engine_profile.prepare_threshold,
+            "options": f"-c statement_timeout={engine_profile.statement_timeout_ms}",
+        },
     )
+    instrument_engine(engine, name)
+    track_queries(engine)
+    return engine
+
+
+# Built on first use rather than at import, so importing the app opens nothing and costs little
+_engine: AsyncEngine | None = None
+_replica_engine: AsyncEngine | None = None
+
+def get_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        _engine = _create_engine(db_config.POSTGRES_URL, "primary")
+    return _engine
+
+def get_replica_engine() -> AsyncEngine | None:
+    global _replica_engine
+    if _replica_engine is None and db_config.POSTGRES_REPLICA_URL:
+        _replica_engine = _create_engine(db_config.POSTGRES_REPLICA_URL, "replica")
+    return _replica_engine
+
+async def dispose_engines() -> None:
+    # Closes every pooled connection; the next get_engine() call builds a new engine
+    global _engine, _replica_engine
+    for engine in (_engine, _replica_engine):
+        if engine is not None:
+            await engine.dispose()
+    _engine = _replica_engine = None
+
+# Zero while the replica has replayed everything it received, so an idle primary doesn't look like lag
+_REPLICA_LAG = text("""
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+""")
+
+
+class ReplicaState:
+    """What this worker currently knows about the read replica."""
+
+    def __init__(self):
+        self.healthy = False
+        self.lag_seconds: float | None = None
+        # Every read uses the primary until then, e.g. while write notifications may have been missed
+        self.pinned_until = float("inf")
+
+    def stats(self) -> dict[str, int | float | None]:
+        return {
+            "configured": int(db_config.POSTGRES_REPLICA_URL is not None),
+            "healthy": int(self.healthy),
+            "lag_seconds": self.lag_seconds,
+            "pinned": int(monotonic() < self.pinned_until),
+        }
+
 
-async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+replica_state = ReplicaState()
+
+# Managers and stores that wrote recently; their reads stay on the primary until the replica has caught up
+recent_writes: TTLCache[UUID, bool] = TTLCache(
+    max_size=app_config.REPLICA_RECENT_WRITES_MAX_SIZE,
+    ttl=app_config.REPLICA_STICKY_SECONDS
+)
+
+
+class RoutingSession(Session):
+    # Sessions flagged with info["replica"] send their reads to the replica; flushes and DML always use the primary
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("replica")
+            and replica_state.healthy
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            return get_replica_engine().sync_engine
+        return get_engine().sync_engine
+
+
+async_session_maker = sessionmaker(class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False)
 
 async def create_db_tables():
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
 
+async def check_schema_revision() -> None:
+    # Fails startup when the database is behind the migrations shipped with this code. A revision this code
+    # doesn't know is newer (migrated ahead of a rolling deploy) and is accepted.
+    scripts = ScriptDirectory.from_config(AlembicConfig(ALEMBIC_INI))
+    async with get_engine().connect() as connection:
+        try:
+            current = set(await connection.scalars(text("SELECT version_num FROM alembic_version")))
+        except ProgrammingError:
+            current = set()
+    heads = set(scripts.get_heads())
+    if current == heads:
+        return
+    known = {revision.revision for revision in scripts.walk_revisions()}
+    behind = (current & known) - heads
+    if not current or behind:
+        raise RuntimeError(
+            f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, expected {', '.join(sorted(heads))}; "
+            "run alembic upgrade head"
+        )
+    logger.warning("Database schema revision %s is newer than this code", ", ".join(sorted(current - known)))
+
+async def prewarm_pool(engine: AsyncEngine, connections: int) -> None:
+    # Opens the connections concurrently and returns them to the pool, so the first requests don't pay for them
+    connections = min(connections, engine.pool.size())
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)), return_exceptions=True)
+    # Every connection that did open goes back to the pool, even when another one failed
+    for connection in opened:
+        if not isinstance(connection, BaseException):
+            await connection.close()
+    for error in opened:
+        if isinstance(error, BaseException):
+            raise error
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+def can_read_from_replica(*keys: UUID | None) -> bool:
+    # keys are the manager and store IDs behind a read; None stands for one that isn't known
+    if db_config.POSTGRES_REPLICA_URL is None or not replica_state.healthy or monotonic() < replica_state.pinned_until:
+        return False
+    return all(key is not None and recent_writes.get(key) is None for key in keys)
+
+async def mark_recent_write(*keys: UUID) -> None:
+    if db_config.POSTGRES_REPLICA_URL is None:
+        return
+    for key in keys:
+        recent_writes.set(key, True)
+    try:
+        await publish(RECENT_WRITES_CHANNEL, " ".join(map(str, keys)))
+    except RedisError:
+        # Other workers aren't told, so their reads may trail this write by up to the replica lag
+        pass
+
+async def monitor_replica() -> None:
+    interval = app_config.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS
+    while True:
+        try:
+            async with asyncio.timeout(interval):
+                async with get_replica_engine().connect() as connection:
+                    lag = float(await connection.scalar(_REPLICA_LAG))
+            replica_state.lag_seconds = lag
+            replica_state.healthy = lag <= app_config.REPLICA_MAX_LAG_SECONDS
+        except (SQLAlchemyError, OSError, TimeoutError):
+            replica_state.lag_seconds = None
+            replica_state.healthy = False
+        await asyncio.sleep(interval)
+
+def _on_recent_write(message: str) -> None:
+    for key in message.split():
+        try:
+            recent_writes.set(UUID(key), True)
+        except ValueError:
+            pass
+
+def _on_recent_writes_resync() -> None:
+    # Writes announced while disconnected were missed, so wait out one window before trusting the replica again
+    replica_state.pinned_until = monotonic() + app_config.REPLICA_STICKY_SECONDS
+
+def _on_recent_writes_disconnect() -> None:
+    replica_state.pinned_until = float("inf")
+
+subscribe(
+    RECENT_WRITES_CHANNEL,
+    _on_recent_write,
+    on_resync=_on_recent_writes_resync,
+    on_disconnect=_on_recent_writes_disconnect
+)
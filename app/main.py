@@ -1,19 +1,68 @@
-from contextlib import asynccontextmanager
+from app.startup import record_import, timed
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from scalar_fastapi import get_scalar_api_reference
-from app.database.session import create_db_tables
+from app.database.redis import close_redis, get_redis, listen
+from app.database.session import (
+    check_schema_revision, create_db_tables, dispose_engines, get_engine, get_replica_engine, monitor_replica,
+    prewarm_pool
+)
+from app.api.core.middleware import MetricsMiddleware, QueryStatsMiddleware
 from app.api.router import master_router
+from app.services.analytics import keep_inventory_valuation_fresh
+from app.metrics import registry
+from app.utils import shutdown_password_executor
+from config import app_config, engine_profile
 
 @asynccontextmanager
 async def lifespan_handler(app: FastAPI):
-    await create_db_tables()
-    yield
+    tasks: list[asyncio.Task] = []
+    try:
+        with timed("startup"):
+            with timed("clients"):
+                engines = [engine for engine in (get_engine(), get_replica_engine()) if engine is not None]
+                get_redis()
+
+            with timed("schema"):
+                if app_config.STARTUP_SCHEMA_MODE == "create":
+                    await create_db_tables()
+                elif app_config.STARTUP_SCHEMA_MODE == "check":
+                    await check_schema_revision()
+
+            if engine_profile.pool_prewarm > 0:
+                with timed("pool_prewarm"):
+                    await asyncio.gather(*(prewarm_pool(engine, engine_profile.pool_prewarm) for engine in engines))
+
+        # Receives cache invalidations broadcast by the other workers
+        tasks.append(asyncio.create_task(listen()))
+        if len(engines) > 1:
+            tasks.append(asyncio.create_task(monitor_replica()))
+        if app_config.ANALYTICS_REFRESH_INTERVAL_SECONDS > 0:
+            tasks.append(asyncio.create_task(keep_inventory_valuation_fresh()))
+        yield
+    finally:
+        # The server has stopped accepting requests and drained the in-flight ones by now, unless startup
+        # failed; either way nothing that holds a socket or a thread outlives the worker
+        for task in tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await asyncio.to_thread(shutdown_password_executor)
+        await dispose_engines()
+        await close_redis()
 
 app = FastAPI(lifespan=lifespan_handler)
 
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(master_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def root():
     return RedirectResponse(url="scalar", status_code=302)
@@ -25,3 +74,4 @@ async def get_scalar_api_docs():
         title="Scalar API",
     )
 
+record_import()
@@ -0,0 +1,201 @@
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Awaitable, Callable, Iterator, Mapping
+
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Recording is a dict lookup and an addition per sample, so metrics stay on at full traffic.
+# Values are per worker; scrape every worker (or its port) and aggregate in Prometheus.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        ...
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        collect: Callable[[], Mapping[tuple[str, ...], float]] | None = None
+    ):
+        # collect, if given, reads the current values at scrape time instead of tracking them
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        values = self._collect() if self._collect is not None else self._values
+        for labels, value in list(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # Per label set: non-cumulative bucket counts (the last one is +Inf), sum and count
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total, count) in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register[M: Metric](self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route and status code", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route", ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+
+sql_statements = registry.register(Counter(
+    "db_statements_total", "SQL statements executed by engine and operation", ("engine", "operation")
+))
+sql_statement_duration = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement latency by engine and operation", ("engine", "operation")
+))
+sql_errors = registry.register(Counter(
+    "db_statement_errors_total", "SQL statements that raised, by engine", ("engine",)
+))
+
+redis_call_duration = registry.register(Histogram(
+    "redis_call_duration_seconds", "Latency of Redis operations, pipelines included, by operation", ("operation",)
+))
+redis_errors = registry.register(Counter(
+    "redis_call_errors_total", "Redis operations that raised, by operation", ("operation",)
+))
+
+_engines: dict[str, AsyncEngine] = {}
+
+def _collect_pool(stat: str) -> Callable[[], dict[tuple[str, ...], float]]:
+    return lambda: {(name,): engine.pool.stats()[stat] for name, engine in _engines.items()}
+
+registry.register(Gauge("db_pool_checked_out", "Connections checked out of the pool", ("engine",), _collect_pool("checked_out")))
+registry.register(Gauge("db_pool_overflow", "Overflow connections in use", ("engine",), _collect_pool("overflow")))
+registry.register(Counter(
+    "db_pool_checkout_seconds_total", "Total time spent checking out connections", ("engine",),
+    _collect_pool("checkout_seconds_total")
+))
+registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for a connection", ("engine",),
+    _collect_pool("checkout_timeouts")
+))
+
+_OPERATION = re.compile(r"\s*(\w+)")
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    _engines[name] = engine
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - context._metrics_started
+        match = _OPERATION.match(statement)
+        operation = match.group(1).upper() if match else "OTHER"
+        sql_statements.inc(name, operation)
+        sql_statement_duration.observe(elapsed, name, operation)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        sql_errors.inc(name)
+
+def timed_redis[**P, R](function: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    # Private helpers are labelled without their leading underscore
+    operation = function.__name__.lstrip("_")
+
+    @wraps(function)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        started = perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        except RedisError:
+            redis_errors.inc(operation)
+            raise
+        finally:
+            redis_call_duration.observe(perf_counter() - started, operation)
+
+    return wrapper
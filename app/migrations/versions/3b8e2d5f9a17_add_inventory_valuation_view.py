@@ -0,0 +1,53 @@
+"""add inventory valuation view
+
+Revision ID: 3b8e2d5f9a17
+Revises: 7c1f0b9e4a52
+Create Date: 2026-10-18 14:02:31.504218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e2d5f9a17'
+down_revision: Union[str, Sequence[str], None] = '7c1f0b9e4a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('materialized_view_refreshes',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("""
+    CREATE MATERIALIZED VIEW inventory_valuation AS
+    SELECT
+        i.store_id,
+        s.name AS store_name,
+        i.category,
+        si.region,
+        coalesce(si.region::text, '') AS region_key,
+        count(*) AS item_count,
+        count(*) FILTER (WHERE i.in_stock) AS in_stock_count,
+        coalesce(sum(i.price_usd) FILTER (WHERE i.in_stock), 0) AS stock_value_usd
+    FROM items i
+    JOIN stores s ON s.id = i.store_id
+    LEFT JOIN store_inventories si ON si.id = i.store_inventory_id
+    GROUP BY i.store_id, s.name, i.category, si.region
+    """)
+    # REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index covering every row
+    op.create_index('ux_inventory_valuation', 'inventory_valuation', ['store_id', 'category', 'region_key'], unique=True)
+    op.execute("INSERT INTO materialized_view_refreshes (name, refreshed_at) VALUES ('inventory_valuation', now())")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP MATERIALIZED VIEW inventory_valuation')
+    op.drop_table('materialized_view_refreshes')
@@ -0,0 +1,46 @@
+"""add items filter and search indexes
+
+Revision ID: 7c1f0b9e4a52
+Revises: de426e63a387
+Create Date: 2026-10-18 11:40:05.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1f0b9e4a52'
+down_revision: Union[str, Sequence[str], None] = 'de426e63a387'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Built concurrently so a large items table stays writable meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index('ix_items_store_id_name_id', 'items', ['store_id', 'name', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_items_store_id_price_usd_id', 'items', ['store_id', 'price_usd', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_items_store_id_category_id', 'items', ['store_id', 'category', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index(
+            'ix_items_store_id_id_out_of_stock', 'items', ['store_id', 'id'], unique=False,
+            postgresql_where=sa.text('NOT in_stock'), postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_items_name_trgm', 'items', ['name'], unique=False,
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_items_name_trgm', table_name='items', postgresql_concurrently=True)
+        op.drop_index('ix_items_store_id_id_out_of_stock', table_name='items', postgresql_concurrently=True)
+        op.drop_index('ix_items_store_id_category_id', table_name='items', postgresql_concurrently=True)
+        op.drop_index('ix_items_store_id_price_usd_id', table_name='items', postgresql_concurrently=True)
+        op.drop_index('ix_items_store_id_name_id', table_name='items', postgresql_concurrently=True)
@@ -0,0 +1,123 @@
+"""add item stats tables and triggers
+
+Revision ID: 9d4a6c1e8b23
+Revises: 3b8e2d5f9a17
+Create Date: 2026-10-18 15:27:44.861390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6c1e8b23'
+down_revision: Union[str, Sequence[str], None] = '3b8e2d5f9a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+APPLY = """
+        WITH changes AS ({changes}),
+        store_stats AS (
+            INSERT INTO store_item_stats AS s (store_id, item_count, in_stock_count, total_price_usd)
+            SELECT store_id, sum(sign), coalesce(sum(sign) FILTER (WHERE in_stock), 0), sum(sign * price_usd::numeric)
+            FROM changes
+            GROUP BY store_id
+            ORDER BY store_id
+            ON CONFLICT (store_id) DO UPDATE SET
+                item_count = s.item_count + excluded.item_count,
+                in_stock_count = s.in_stock_count + excluded.in_stock_count,
+                total_price_usd = s.total_price_usd + excluded.total_price_usd
+        )
+        INSERT INTO store_inventory_item_stats AS s (store_inventory_id, item_count, in_stock_count, total_price_usd)
+        SELECT store_inventory_id, sum(sign), coalesce(sum(sign) FILTER (WHERE in_stock), 0), sum(sign * price_usd::numeric)
+        FROM changes
+        WHERE store_inventory_id IS NOT NULL
+        GROUP BY store_inventory_id
+        ORDER BY store_inventory_id
+        ON CONFLICT (store_inventory_id) DO UPDATE SET
+            item_count = s.item_count + excluded.item_count,
+            in_stock_count = s.in_stock_count + excluded.in_stock_count,
+            total_price_usd = s.total_price_usd + excluded.total_price_usd;"""
+
+FUNCTION = f"""
+CREATE OR REPLACE FUNCTION items_maintain_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN{APPLY.format(changes='''
+            SELECT store_id, store_inventory_id, in_stock, price_usd, 1 AS sign FROM new_items
+        ''')}
+    ELSIF TG_OP = 'UPDATE' THEN{APPLY.format(changes='''
+            SELECT c.* FROM old_items o JOIN new_items n USING (id)
+            CROSS JOIN LATERAL (VALUES
+                (o.store_id, o.store_inventory_id, o.in_stock, o.price_usd, -1),
+                (n.store_id, n.store_inventory_id, n.in_stock, n.price_usd, 1)
+            ) AS c(store_id, store_inventory_id, in_stock, price_usd, sign)
+            WHERE (o.store_id, o.store_inventory_id, o.in_stock, o.price_usd)
+                IS DISTINCT FROM (n.store_id, n.store_inventory_id, n.in_stock, n.price_usd)
+        ''')}
+    ELSE{APPLY.format(changes='''
+            SELECT store_id, store_inventory_id, in_stock, price_usd, -1 AS sign FROM old_items
+        ''')}
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = (
+    ('INSERT', 'NEW TABLE AS new_items'),
+    ('UPDATE', 'OLD TABLE AS old_items NEW TABLE AS new_items'),
+    ('DELETE', 'OLD TABLE AS old_items'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('store_item_stats',
+    sa.Column('item_count', sa.BigInteger(), nullable=False),
+    sa.Column('in_stock_count', sa.BigInteger(), nullable=False),
+    sa.Column('total_price_usd', sa.Numeric(), nullable=False),
+    sa.Column('store_id', sa.Uuid(), nullable=False),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('store_id')
+    )
+    op.create_table('store_inventory_item_stats',
+    sa.Column('item_count', sa.BigInteger(), nullable=False),
+    sa.Column('in_stock_count', sa.BigInteger(), nullable=False),
+    sa.Column('total_price_usd', sa.Numeric(), nullable=False),
+    sa.Column('store_inventory_id', sa.Uuid(), nullable=False),
+    sa.ForeignKeyConstraint(['store_inventory_id'], ['store_inventories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('store_inventory_id')
+    )
+
+    # Blocks item writes until the transaction commits, so none land between the backfill and the triggers
+    op.execute('LOCK TABLE items IN SHARE ROW EXCLUSIVE MODE')
+    op.execute(FUNCTION)
+    for operation, transition in TRIGGERS:
+        op.execute(
+            f'CREATE TRIGGER items_stats_{operation.lower()} AFTER {operation} ON items '
+            f'REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION items_maintain_stats()'
+        )
+    op.execute("""
+    INSERT INTO store_item_stats (store_id, item_count, in_stock_count, total_price_usd)
+    SELECT store_id, count(*), count(*) FILTER (WHERE in_stock), coalesce(sum(price_usd::numeric), 0)
+    FROM items
+    GROUP BY store_id
+    """)
+    op.execute("""
+    INSERT INTO store_inventory_item_stats (store_inventory_id, item_count, in_stock_count, total_price_usd)
+    SELECT store_inventory_id, count(*), count(*) FILTER (WHERE in_stock), coalesce(sum(price_usd::numeric), 0)
+    FROM items
+    WHERE store_inventory_id IS NOT NULL
+    GROUP BY store_inventory_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for operation, _ in TRIGGERS:
+        op.execute(f'DROP TRIGGER items_stats_{operation.lower()} ON items')
+    op.execute('DROP FUNCTION items_maintain_stats()')
+    op.drop_table('store_inventory_item_stats')
+    op.drop_table('store_item_stats')
@@ -0,0 +1,28 @@
+"""add items store_id id index
+
+Revision ID: de426e63a387
+Revises: 294e8463f3b1
+Create Date: 2026-10-18 09:12:31.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'de426e63a387'
+down_revision: Union[str, Sequence[str], None] = '294e8463f3b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_items_store_id_id', 'items', ['store_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_store_id_id', table_name='items')
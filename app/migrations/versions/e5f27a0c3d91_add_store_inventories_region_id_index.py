@@ -0,0 +1,32 @@
+"""add store_inventories region id index
+
+Revision ID: e5f27a0c3d91
+Revises: 9d4a6c1e8b23
+Create Date: 2026-10-18 16:10:12.390557
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f27a0c3d91'
+down_revision: Union[str, Sequence[str], None] = '9d4a6c1e8b23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_store_inventories_region_id', 'store_inventories', ['region', 'id'], unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_store_inventories_region_id', table_name='store_inventories', postgresql_concurrently=True)
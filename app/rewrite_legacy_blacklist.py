@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import json
+from time import time
+from uuid import UUID
+
+from app.database.redis import add_many_to_token_blacklist, close_redis, get_redis
+
+# Blacklist entries from before keys were namespaced are bare-jti keys holding a JSON document
+UUID_PATTERN = "????????-????-????-????-????????????"
+
+
+async def rewrite(dry_run: bool) -> int:
+    # Redis is shared with other data, so only keys of exactly that shape are moved. Returns how many were found
+    redis = get_redis()
+    found = 0
+    async for key in redis.scan_iter(match=UUID_PATTERN, count=1000):
+        try:
+            token_id = key.decode()
+            UUID(token_id)
+            entry = json.loads(await redis.get(key) or b"")
+        except (UnicodeDecodeError, ValueError, TypeError):
+            continue
+        if not isinstance(entry, dict) or entry.get("jti") != token_id or entry.get("status") != "blacklisted":
+            continue
+
+        found += 1
+        if dry_run:
+            continue
+        ttl = await redis.ttl(key)
+        if ttl > 0:
+            # Also broadcast, so running workers block the token without waiting for a resync
+            await add_many_to_token_blacklist({token_id: int(time()) + ttl})
+        await redis.delete(key)
+    return found
+
+
+async def run(dry_run: bool) -> int:
+    try:
+        return await rewrite(dry_run)
+    finally:
+        await close_redis()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.rewrite_legacy_blacklist",
+        description="Move token blacklist entries of the old bare-jti format to blacklist:jti:{jti} keys"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only count the legacy entries")
+    args = parser.parse_args(argv)
+
+    found = asyncio.run(run(args.dry_run))
+    print(f"{found} legacy entries {'found' if args.dry_run else 'moved'}")
+
+
+if __name__ == "__main__":
+    main()
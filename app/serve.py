@@ -0,0 +1,41 @@
+import argparse
+import uvicorn
+
+from config import app_config
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="serve", description="Run the API with multiple uvicorn worker processes")
+    parser.add_argument("--host", default=app_config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=app_config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=app_config.SERVER_WORKERS, help="Worker processes")
+    parser.add_argument(
+        "--graceful-shutdown", type=int, default=app_config.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        help="Seconds a stopping worker waits for in-flight requests"
+    )
+    parser.add_argument(
+        "--forwarded-allow-ips", default=app_config.SERVER_FORWARDED_ALLOW_IPS,
+        help="Proxies trusted to set X-Forwarded-For, comma-separated, or * for any"
+    )
+    parser.add_argument("--access-log", action="store_true", help="Log every request (off by default, it costs CPU)")
+    args = parser.parse_args(argv)
+
+    # Workers are separate processes that each import the app, so each one builds its own engines and
+    # Redis pool in the lifespan and nothing holding a socket crosses a fork
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        timeout_graceful_shutdown=args.graceful_shutdown,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        access_log=args.access_log,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from datetime import timedelta
+from fastapi import HTTPException
+from http import HTTPStatus
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas.analytics import InventoryValuation, InventoryValuationGroup, ValuationGroupBy
+from app.database.models import MaterializedViewRefresh, StoreManager, inventory_valuation
+from app.database.session import get_engine
+from config import app_config
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_VALUATION = "inventory_valuation"
+# Held for the refresh transaction, so only one worker refreshes at a time
+_REFRESH_LOCK_KEY = 0x616E616C79746963
+
+_GROUP_COLUMNS = {
+    ValuationGroupBy.CATEGORY: inventory_valuation.c.category,
+    ValuationGroupBy.REGION: inventory_valuation.c.region,
+}
+
+
+class AnalyticsService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def inventory_valuation(self, manager: StoreManager, group_by: list[ValuationGroupBy]) -> InventoryValuation:
+        if manager.store_id is None:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
+
+        # The view holds one row per category and region, so coarser groupings just add those up
+        columns = [_GROUP_COLUMNS[dimension] for dimension in dict.fromkeys(group_by)]
+        statement = (
+            select(
+                *columns,
+                func.sum(inventory_valuation.c.item_count).label("item_count"),
+                func.sum(inventory_valuation.c.in_stock_count).label("in_stock_count"),
+                func.sum(inventory_valuation.c.stock_value_usd).label("stock_value_usd"),
+            )
+            .where(inventory_valuation.c.store_id == manager.store_id)
+            .group_by(*columns)
+            .order_by(*columns)
+        )
+        rows = (await self.session.execute(statement)).mappings().all()
+        refreshed_at = await self.session.scalar(
+            select(MaterializedViewRefresh.refreshed_at).where(MaterializedViewRefresh.name == INVENTORY_VALUATION)
+        )
+
+        return InventoryValuation(
+            store_id=manager.store_id,
+            refreshed_at=refreshed_at,
+            groups=[self._group(row) for row in rows]
+        )
+
+    @staticmethod
+    def _group(row) -> InventoryValuationGroup:
+        # sum() over the view's bigint counts comes back as numeric
+        item_count, in_stock_count = int(row["item_count"]), int(row["in_stock_count"])
+        return InventoryValuationGroup(
+            category=row.get("category"),
+            region=row.get("region"),
+            item_count=item_count,
+            in_stock_count=in_stock_count,
+            in_stock_ratio=in_stock_count / item_count,
+            stock_value_usd=row["stock_value_usd"],
+        )
+
+
+async def refresh_inventory_valuation(max_age_seconds: float) -> bool:
+    # Returns whether this call refreshed the view; it is skipped while another worker is refreshing
+    # or when the last refresh is younger than max_age_seconds
+    async with get_engine().begin() as connection:
+        if not await connection.scalar(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_KEY))):
+            return False
+
+        fresh = await connection.scalar(
+            select(MaterializedViewRefresh.refreshed_at > func.now() - timedelta(seconds=max_age_seconds))
+            .where(MaterializedViewRefresh.name == INVENTORY_VALUATION)
+        )
+        if fresh:
+            return False
+
+        # Readers keep seeing the previous contents until this commits; bounded by the interval rather
+        # than the request statement timeout, since it scans every item
+        await connection.execute(text(f"SET LOCAL statement_timeout = {int(max_age_seconds * 1000)}"))
+        await connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {INVENTORY_VALUATION}"))
+        await connection.execute(
+            insert(MaterializedViewRefresh)
+            .values(name=INVENTORY_VALUATION, refreshed_at=func.now())
+            .on_conflict_do_update(index_elements=["name"], set_={"refreshed_at": func.now()})
+        )
+    return True
+
+
+async def keep_inventory_valuation_fresh() -> None:
+    interval = app_config.ANALYTICS_REFRESH_INTERVAL_SECONDS
+    while True:
+        try:
+            await refresh_inventory_valuation(interval)
+        except Exception:
+            # Anything but cancellation is logged and retried, so the view never silently stops refreshing
+            logger.exception("Refreshing %s failed", INVENTORY_VALUATION)
+        await asyncio.sleep(interval)
@@ -0,0 +1,114 @@
+import asyncio
+from time import monotonic, perf_counter
+from typing import Awaitable, Callable
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.redis import acquire_lock, cache_get, cache_invalidate, cache_set, release_lock
+from app.database.session import async_session_maker
+
+type Loader = Callable[[AsyncSession], Awaitable[bytes | None]]
+
+
+class ReadThroughCache:
+    """Redis read-through cache with one hash per scope (e.g. per store).
+
+    Every value cached for a scope is a field of the same hash, so a write
+    invalidates all of them at once. Concurrent misses on a field are
+    collapsed into one load per worker, and a short Redis lock stops the
+    other workers from rebuilding the same field at the same time. A
+    collapsed load outlives the request that started it, so it runs on a
+    session of its own rather than on that request's.
+    """
+
+    def __init__(self, prefix: str, enabled: bool, ttl: int, lock_timeout: float):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.rebuild_seconds = 0.0
+        self._inflight: dict[tuple[str, str], asyncio.Task[bytes | None]] = {}
+
+    async def get_or_load(self, scope: str, field: str, load: Loader, session: AsyncSession) -> bytes | None:
+        # load returns None for values that must not be cached (e.g. not found); uncollapsed loads use session
+        if not self.enabled:
+            return await load(session)
+
+        key = f"{self.prefix}{scope}"
+        try:
+            value, _ = await cache_get(key, field)
+        except RedisError:
+            return await load(session)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        slot = (key, field)
+        rebuild = self._inflight.get(slot)
+        if rebuild is None:
+            rebuild = asyncio.create_task(self._rebuild(key, field, load))
+            self._inflight[slot] = rebuild
+            rebuild.add_done_callback(lambda _: self._inflight.pop(slot, None))
+        return await asyncio.shield(rebuild)
+
+    async def invalidate(self, scope: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            await cache_invalidate(f"{self.prefix}{scope}", self.ttl)
+        except RedisError:
+            # Readers may see stale entries until the hash expires
+            pass
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "rebuilds": self.rebuilds,
+            "rebuild_seconds_total": self.rebuild_seconds,
+        }
+
+    async def _rebuild(self, key: str, field: str, load: Loader) -> bytes | None:
+        async with async_session_maker() as session:
+            return await self._rebuild_with(key, field, load, session)
+
+    async def _rebuild_with(self, key: str, field: str, load: Loader, session: AsyncSession) -> bytes | None:
+        lock = f"{key}:lock:{field}"
+        try:
+            token = await acquire_lock(lock, self.lock_timeout)
+            if token is None:
+                # Another worker is already loading this field, wait for its result instead
+                deadline = monotonic() + self.lock_timeout
+                while monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                    value, _ = await cache_get(key, field)
+                    if value is not None:
+                        return value
+            _, generation = await cache_get(key, field)
+        except RedisError:
+            return await load(session)
+
+        started = perf_counter()
+        try:
+            value = await load(session)
+            if value is not None:
+                try:
+                    await cache_set(key, field, value, generation, self.ttl)
+                except RedisError:
+                    pass
+        finally:
+            if token is not None:
+                try:
+                    await release_lock(lock, token)
+                except RedisError:
+                    pass
+
+        self.rebuilds += 1
+        self.rebuild_seconds += perf_counter() - started
+        return value
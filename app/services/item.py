@@ -1,18 +1,50 @@
-from uuid import UUID
+import json
+from typing import Any, AsyncIterator, NoReturn
+from uuid import UUID, uuid4
 from fastapi import HTTPException
 from http import HTTPStatus
+from pydantic_core import to_json
+from sqlalchemy import delete, insert, tuple_, update as sql_update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.api.schemas.item import ItemCreate, ItemUpdate
-from app.database.models import Item, StoreManager
+from app.api.schemas.item import ItemCreate, ItemQuery, ItemRead, ItemSort, ItemUpdate
+from app.database.models import Item, StoreInventory, StoreManager
+from app.services.cache import ReadThroughCache
+from app.services.store import touch_store
+from app.utils import decode_cursor, encode_cursor
+from config import app_config
+
+# Single items and item lists, one Redis hash per store
+item_cache = ReadThroughCache(
+    prefix="items:store:",
+    enabled=app_config.ITEM_CACHE_ENABLED,
+    ttl=app_config.ITEM_CACHE_TTL_SECONDS,
+    lock_timeout=app_config.ITEM_CACHE_LOCK_TIMEOUT_SECONDS
+)
+
+# Reads select just these columns and serialize the rows as they are, skipping ORM objects and re-validation
+ITEM_READ_COLUMNS = tuple(getattr(Item, name) for name in ItemRead.model_fields)
+
+# Secondary sort column per sort order; id always breaks ties
+_SORT_COLUMNS = {
+    ItemSort.ID: None,
+    ItemSort.NAME: Item.name,
+    ItemSort.NAME_DESC: Item.name,
+    ItemSort.PRICE: Item.price_usd,
+    ItemSort.PRICE_DESC: Item.price_usd,
+}
+
+async def items_changed(store_id: UUID) -> None:
+    await item_cache.invalidate(str(store_id))
+    await touch_store(store_id)
 
 
 class ItemService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get(self, id: UUID, manager: StoreManager) -> Item | None:
+    async def get(self, id: UUID, manager: StoreManager) -> Item:
         item = await self.session.get(Item, id)
         if item is None:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Item with id {id} not found")
@@ -25,13 +57,148 @@ class ItemService:
 
         return item
 
+    async def read_json(self, id: UUID, manager: StoreManager) -> bytes:
+        # An ItemRead as JSON, straight from the cache or from a column select, never through the ORM
+        if item_cache.enabled and manager.store_id is not None:
+            cached = await item_cache.get_or_load(
+                str(manager.store_id), f"item:{id}",
+                lambda session: ItemService(session)._dump_item(id, manager.store_id), self.session
+            )
+            if cached is not None:
+                return cached
+
+        row = await self._load_row(id)
+        if row is None:
+            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Item with id {id} not found")
+
+        # Verify ownership
+        if manager.store_id is None:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
+        if row["store_id"] != manager.store_id:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Item does not belong to manager's store")
+
+        return to_json(row)
+
     async def get_all(self, manager: StoreManager) -> list[Item]:
         if manager.store_id is None:
             raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
 
-        result = await self.session.execute(select(Item).where(Item.store_id == manager.store_id))
+        if item_cache.enabled:
+            cached = await item_cache.get_or_load(
+                str(manager.store_id), "all", lambda session: ItemService(session)._dump_all(manager.store_id), self.session
+            )
+            return [Item.model_validate(item) for item in json.loads(cached)]
+        return await self._load_all(manager.store_id)
+
+    async def read_page_json(self, manager: StoreManager, query: ItemQuery) -> bytes:
+        # An ItemPage as JSON
+        if manager.store_id is None:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
+
+        # Free-text searches are too varied to be worth caching
+        if item_cache.enabled and query.q is None:
+            return await item_cache.get_or_load(
+                str(manager.store_id), f"page:{query.model_dump_json(exclude_none=True)}",
+                lambda session: ItemService(session)._dump_page(manager.store_id, query), self.session
+            )
+        return await self._dump_page(manager.store_id, query)
+
+    async def _load_all(self, store_id: UUID) -> list[Item]:
+        result = await self.session.execute(select(Item).where(Item.store_id == store_id))
         return list(result.scalars().all())
 
+    async def _load_row(self, id: UUID) -> dict[str, Any] | None:
+        result = await self.session.execute(select(*ITEM_READ_COLUMNS).where(Item.id == id))
+        row = result.first()
+        return row._asdict() if row is not None else None
+
+    async def _load_page(self, store_id: UUID, query: ItemQuery) -> tuple[list[dict[str, Any]], str | None]:
+        statement = select(*ITEM_READ_COLUMNS).where(Item.store_id == store_id)
+        if query.category:
+            statement = statement.where(Item.category.in_(query.category))
+        if query.min_price is not None:
+            statement = statement.where(Item.price_usd >= query.min_price)
+        if query.max_price is not None:
+            statement = statement.where(Item.price_usd <= query.max_price)
+        if query.in_stock is not None:
+            statement = statement.where(Item.in_stock == query.in_stock)
+        if query.q is not None:
+            pattern = query.q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            statement = statement.where(Item.name.ilike(f"%{pattern}%", escape="\\"))
+
+        # Keyset on (store_id, sort column, id): each sort has an index in that order, so deep pages stay cheap
+        column = _SORT_COLUMNS[query.sort]
+        descending = query.sort.value.startswith("-")
+        keys = (column, Item.id) if column is not None else (Item.id,)
+        if query.cursor is not None:
+            after = self._parse_cursor(query.cursor, query.sort)
+            position = tuple_(*keys) if len(keys) > 1 else keys[0]
+            bound = tuple_(*after) if len(after) > 1 else after[0]
+            statement = statement.where(position < bound if descending else position > bound)
+
+        # Fetch one extra row to know if there is a next page
+        order = [key.desc() if descending else key for key in keys]
+        result = await self.session.execute(statement.order_by(Item.store_id, *order).limit(query.limit + 1))
+        rows = [row._asdict() for row in result.all()]
+        if len(rows) <= query.limit:
+            return rows, None
+
+        rows = rows[:query.limit]
+        last = rows[-1]
+        values = [str(last["id"])] if column is None else [last[column.key], str(last["id"])]
+        return rows, encode_cursor([query.sort.value, *values])
+
+    async def _dump_item(self, id: UUID, store_id: UUID) -> bytes | None:
+        # Only items of the manager's own store are cached; errors go through the uncached path
+        row = await self._load_row(id)
+        if row is None or row["store_id"] != store_id:
+            return None
+        return to_json(row)
+
+    async def _dump_all(self, store_id: UUID) -> bytes:
+        items = await self._load_all(store_id)
+        return to_json(items)
+
+    async def _dump_page(self, store_id: UUID, query: ItemQuery) -> bytes:
+        rows, next_cursor = await self._load_page(store_id, query)
+        return to_json({"items": rows, "next_cursor": next_cursor})
+
+    @staticmethod
+    def _parse_cursor(cursor: str, sort: ItemSort) -> tuple:
+        # [sort, id] or [sort, sort column value, id]; a cursor from another sort order is rejected
+        values = decode_cursor(cursor)
+        column = _SORT_COLUMNS[sort]
+        try:
+            if values[0] != sort.value or len(values) != (2 if column is None else 3):
+                raise ValueError
+            if column is None:
+                return (UUID(values[1]),)
+            expected = (int, float) if column is Item.price_usd else str
+            if not isinstance(values[1], expected) or isinstance(values[1], bool):
+                raise ValueError
+            return values[1], UUID(values[2])
+        except (TypeError, IndexError, ValueError, AttributeError):
+            # AttributeError: a JSON number where the ID should be
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+
+    def stream_all(self, manager: StoreManager, batch_size: int = 1000) -> AsyncIterator[list[dict[str, Any]]]:
+        # Not a coroutine so the ownership check fails before the response starts streaming
+        if manager.store_id is None:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
+
+        return self._stream_store(manager.store_id, batch_size)
+
+    async def _stream_store(self, store_id: UUID, batch_size: int) -> AsyncIterator[list[dict[str, Any]]]:
+        # Server-side cursor: only one batch of rows is held in memory at a time
+        result = await self.session.stream(
+            select(*ITEM_READ_COLUMNS)
+            .where(Item.store_id == store_id)
+            .order_by(Item.store_id, Item.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for batch in result.partitions():
+            yield [row._asdict() for row in batch]
+
     async def add(self, item: ItemCreate, manager: StoreManager) -> Item:
         if manager.store_id is None:
             raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
@@ -39,37 +206,81 @@ class ItemService:
         created = Item(**item.model_dump(), store_id=manager.store_id)
         self.session.add(created)
         await self.session.commit()
+        await items_changed(manager.store_id)
         await self.session.refresh(created)
         return created
 
-    async def update(self, id: UUID, update: ItemUpdate, manager: StoreManager) -> Item:
-        item = await self.session.get(Item, id)
-        if item is None:
-            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Item with id {id} not found")
+    async def add_many(self, items: list[ItemCreate], manager: StoreManager) -> list[UUID]:
+        if manager.store_id is None:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
+        if len(items) > app_config.ITEM_BULK_MAX_SIZE:
+            raise HTTPException(
+                status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {app_config.ITEM_BULK_MAX_SIZE} items can be created at once"
+            )
+        if not items:
+            return []
 
-        # Verify ownership
+        # Check every referenced inventory with a single query
+        inventory_ids = {item.store_inventory_id for item in items if item.store_inventory_id is not None}
+        if inventory_ids:
+            result = await self.session.execute(select(StoreInventory.id).where(StoreInventory.id.in_(inventory_ids)))
+            missing = inventory_ids - set(result.scalars().all())
+            if missing:
+                raise HTTPException(
+                    status_code=HTTPStatus.NOT_FOUND,
+                    detail=f"StoreInventory with id {min(missing)} not found"
+                )
+
+        # IDs are generated up front so the RETURNING rows can be put back in input order
+        rows = [{**item.model_dump(), "id": uuid4(), "store_id": manager.store_id} for item in items]
+        position = {row["id"]: index for index, row in enumerate(rows)}
+
+        result = await self.session.execute(insert(Item).values(rows).returning(Item.id))
+        created = sorted(result.scalars().all(), key=position.__getitem__)
+        await self.session.commit()
+        await items_changed(manager.store_id)
+        return created
+
+    async def update(self, id: UUID, update: ItemUpdate, manager: StoreManager) -> Item:
         if manager.store_id is None:
             raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
-        if item.store_id != manager.store_id:
-            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Item does not belong to manager's store")
 
-        item.sqlmodel_update(update.model_dump(exclude_unset=True))
-        self.session.add(item)
+        changes = update.model_dump(exclude_unset=True)
+        if not changes:
+            return await self.get(id, manager)
+
+        # Ownership is part of the WHERE clause, so the write takes a single round trip
+        result = await self.session.execute(
+            sql_update(Item)
+            .where(Item.id == id, Item.store_id == manager.store_id)
+            .values(**changes)
+            .returning(Item),
+            execution_options={"populate_existing": True}
+        )
+        item = result.scalar_one_or_none()
+        if item is None:
+            await self._raise_missing(id)
+
         await self.session.commit()
-        await self.session.refresh(item)
+        await items_changed(manager.store_id)
         return item
 
     async def delete(self, id: UUID, manager: StoreManager) -> None:
-        item = await self.session.get(Item, id)
-        if item is None:
-            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Item with id {id} not found")
-
-        # Verify ownership
         if manager.store_id is None:
             raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
-        if item.store_id != manager.store_id:
-            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Item does not belong to manager's store")
 
-        await self.session.delete(item)
-        await self.session.flush()
-        await self.session.commit()
\ No newline at end of file
+        result = await self.session.execute(
+            delete(Item).where(Item.id == id, Item.store_id == manager.store_id).returning(Item.id)
+        )
+        if result.scalar_one_or_none() is None:
+            await self._raise_missing(id)
+
+        await self.session.commit()
+        await items_changed(manager.store_id)
+
+    async def _raise_missing(self, id: UUID) -> NoReturn:
+        # Only reached when a scoped write matched nothing: tell a missing item apart from someone else's
+        if await self.session.scalar(select(Item.id).where(Item.id == id)) is None:
+            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Item with id {id} not found")
+        raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Item does not belong to manager's store")
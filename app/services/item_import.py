@@ -0,0 +1,176 @@
+import csv
+from time import perf_counter
+from typing import AsyncIterator
+from fastapi import HTTPException
+from http import HTTPStatus
+from psycopg import DataError, sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas.item import ItemImportError, ItemImportResult
+from app.database.models import Category, StoreManager
+from app.services.item import items_changed
+from config import app_config
+
+REQUIRED_COLUMNS = ("name", "category", "price_usd", "in_stock")
+OPTIONAL_COLUMNS = ("store_id", "store_inventory_id")
+MAX_HEADER_BYTES = 64 * 1024
+
+# Every column is text so a bad value is reported per row instead of aborting the COPY
+_CREATE_STAGING = """
+CREATE TEMP TABLE items_import (
+    row_number bigint GENERATED ALWAYS AS IDENTITY,
+    name text,
+    category text,
+    price_usd text,
+    in_stock text,
+    store_id text,
+    store_inventory_id text,
+    error text
+) ON COMMIT DROP
+"""
+
+# Accept both the enum value ("Personal Care") and its name ("PERSONAL_CARE")
+_NORMALIZE_CATEGORIES = """
+UPDATE items_import AS s
+SET category = c.name
+FROM unnest(%(labels)s::text[], %(names)s::text[]) AS c(label, name)
+WHERE btrim(s.category) = c.label
+"""
+
+_VALIDATE = r"""
+UPDATE items_import SET error = CASE
+    -- COPY reads an empty quoted field as '' rather than NULL
+    WHEN name IS NULL OR btrim(name) = '' OR char_length(name) > 64 THEN 'name must be 1-64 characters'
+    WHEN category IS NULL OR category <> ALL(%(names)s::text[]) THEN 'unknown category'
+    WHEN price_usd IS NULL OR price_usd !~ '^\s*([0-9]+(\.[0-9]*)?|\.[0-9]+)\s*$'
+        THEN 'price_usd must be a non-negative number'
+    -- Separate branches, so the numeric cast only sees short, well-formed values and the merge's
+    -- double precision cast can't overflow
+    WHEN char_length(btrim(price_usd)) > 32 THEN 'price_usd is out of range'
+    WHEN btrim(price_usd)::numeric > 1e15 THEN 'price_usd is out of range'
+    WHEN in_stock IS NULL
+        OR lower(btrim(in_stock)) <> ALL(ARRAY['true', 'false', 't', 'f', 'yes', 'no', 'y', 'n', '1', '0', 'on', 'off'])
+        THEN 'in_stock must be a boolean'
+    WHEN store_id IS NOT NULL AND lower(btrim(store_id)) <> %(store_id)s
+        THEN 'store_id does not match the manager''s store'
+    WHEN store_inventory_id IS NOT NULL
+        AND btrim(store_inventory_id) !~* '^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$'
+        THEN 'store_inventory_id must be a UUID'
+    WHEN store_inventory_id IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM store_inventories si WHERE si.id = btrim(store_inventory_id)::uuid)
+        THEN 'store inventory not found'
+END
+"""
+
+_MERGE = """
+INSERT INTO items (id, name, category, price_usd, in_stock, store_id, store_inventory_id)
+SELECT
+    gen_random_uuid(),
+    name,
+    category::category,
+    btrim(price_usd)::double precision,
+    btrim(in_stock)::boolean,
+    %(store_id)s::uuid,
+    btrim(store_inventory_id)::uuid
+FROM items_import
+WHERE error IS NULL
+"""
+
+_REJECTED = """
+SELECT row_number, error, count(*) OVER ()
+FROM items_import
+WHERE error IS NOT NULL
+ORDER BY row_number
+LIMIT %(limit)s
+"""
+
+
+class ItemImportService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def import_csv(self, chunks: AsyncIterator[bytes], manager: StoreManager) -> ItemImportResult:
+        if manager.store_id is None:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
+
+        started = perf_counter()
+        columns, remainder = await self._read_header(chunks)
+        store_id = str(manager.store_id)
+
+        # COPY goes through psycopg directly, inside the session's transaction
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        copy_statement = sql.SQL("COPY items_import ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+        async with driver_connection.cursor() as cursor:
+            # Large imports outlast the per-request statement timeout; SET LOCAL ends with the transaction
+            await cursor.execute(sql.SQL("SET LOCAL statement_timeout = {}").format(
+                sql.Literal(int(app_config.ITEM_IMPORT_STATEMENT_TIMEOUT_SECONDS * 1000))
+            ))
+            await cursor.execute(_CREATE_STAGING)
+            try:
+                async with cursor.copy(copy_statement) as copy:
+                    if remainder:
+                        await copy.write(remainder)
+                    async for chunk in chunks:
+                        await copy.write(chunk)
+            except DataError as e:
+                raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=f"Malformed CSV: {e}")
+
+            categories = {category.value: category.name for category in Category}
+            categories.update({category.name: category.name for category in Category})
+            await cursor.execute(
+                _NORMALIZE_CATEGORIES,
+                {"labels": list(categories), "names": list(categories.values())}
+            )
+            await cursor.execute(
+                _VALIDATE,
+                {"names": [category.name for category in Category], "store_id": store_id}
+            )
+
+            await cursor.execute(_MERGE, {"store_id": store_id})
+            imported = cursor.rowcount
+
+            await cursor.execute(_REJECTED, {"limit": app_config.ITEM_IMPORT_MAX_REPORTED_ERRORS})
+            rejected_rows = await cursor.fetchall()
+
+        await self.session.commit()
+        await items_changed(manager.store_id)
+
+        rejected = rejected_rows[0][2] if rejected_rows else 0
+        elapsed = perf_counter() - started
+        return ItemImportResult(
+            imported=imported,
+            rejected=rejected,
+            elapsed_seconds=elapsed,
+            rows_per_second=(imported + rejected) / elapsed if elapsed > 0 else 0.0,
+            errors=[ItemImportError(row=row, error=error) for row, error, _ in rejected_rows]
+        )
+
+    @staticmethod
+    async def _read_header(chunks: AsyncIterator[bytes]) -> tuple[list[str], bytes]:
+        # Consume just enough of the upload to parse the header; the rest is fed to COPY as is
+        buffer = b""
+        async for chunk in chunks:
+            buffer += chunk
+            if b"\n" in buffer or len(buffer) > MAX_HEADER_BYTES:
+                break
+
+        header, _, remainder = buffer.partition(b"\n")
+        try:
+            columns = [column.strip() for column in next(csv.reader([header.decode("utf-8-sig")]))]
+        except (UnicodeDecodeError, StopIteration):
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="CSV header row is missing or unreadable")
+
+        unknown = set(columns) - set(REQUIRED_COLUMNS) - set(OPTIONAL_COLUMNS)
+        missing = set(REQUIRED_COLUMNS) - set(columns)
+        if unknown or missing or len(set(columns)) != len(columns):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"CSV header must contain {', '.join(REQUIRED_COLUMNS)} and optionally "
+                       f"{', '.join(OPTIONAL_COLUMNS)}, each once"
+            )
+        return columns, remainder
@@ -1,33 +1,62 @@
+from typing import Any
 from uuid import UUID
 from fastapi import HTTPException
 from http import HTTPStatus
+from redis.exceptions import RedisError
+from sqlalchemy import update as sql_update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from app.api.schemas.store import StoreCreate, StoreUpdate
-from app.database.models import Store, StoreManager, Item
+from app.database.models import Store, StoreItemStats, StoreManager
+from app.database.redis import bump_store_version
+from app.database.session import mark_recent_write
+from app.services.store_manager import invalidate_cached_manager
+from config import app_config
+
+STORE_READ_COLUMNS = (Store.id, Store.name, Store.location, *StoreItemStats.read_columns())
+
+
+async def touch_store(store_id: UUID) -> None:
+    # Changes the store's ETag; the version key expires, so a failed bump only serves stale data for one TTL
+    try:
+        await bump_store_version(str(store_id), app_config.STORE_VERSION_TTL_SECONDS)
+    except RedisError:
+        pass
+    # Keeps the store's reads on the primary, so the new ETag is never served with data the replica hasn't seen
+    await mark_recent_write(store_id)
 
 
 class StoreService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get(self, id: UUID, manager: StoreManager) -> Store | None:
+    async def read(self, id: UUID, manager: StoreManager) -> dict[str, Any] | None:
         # Verify ownership
         if manager.store_id is None:
             raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager is not assigned to any store")
         if manager.store_id != id:
             raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager does not own this store")
 
-        return await self.session.get(Store, id)
+        return await self._load_row(id)
 
-    async def get_all(self, manager: StoreManager) -> list[Store]:
+    async def read_all(self, manager: StoreManager) -> list[dict[str, Any]]:
         # Managers can only see their own store
         if manager.store_id is None:
             return []
 
-        store = await self.session.get(Store, manager.store_id)
-        return [store] if store else []
+        row = await self._load_row(manager.store_id)
+        return [row] if row else []
+
+    async def _load_row(self, id: UUID) -> dict[str, Any] | None:
+        # A StoreRead row with its item counters, without building an ORM object
+        result = await self.session.execute(
+            select(*STORE_READ_COLUMNS)
+            .outerjoin(StoreItemStats, StoreItemStats.store_id == Store.id)
+            .where(Store.id == id)
+        )
+        row = result.first()
+        return row._asdict() if row is not None else None
 
     async def add(self, store: StoreCreate, manager: StoreManager, assign_to_self: bool = False) -> Store:
         created = Store(**store.model_dump())
@@ -47,6 +76,8 @@ class StoreService:
             self.session.add(manager)
 
         await self.session.commit()
+        if assign_to_self:
+            await invalidate_cached_manager(manager.id)
         await self.session.refresh(created)
         return created
 
@@ -57,17 +88,24 @@ class StoreService:
         if manager.store_id != id:
             raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Manager does not own this store")
 
-        store = await self.session.get(Store, id)
+        changes = update.model_dump(exclude_unset=True)
+        if changes:
+            result = await self.session.execute(
+                sql_update(Store).where(Store.id == id).values(**changes).returning(Store),
+                execution_options={"populate_existing": True}
+            )
+            store = result.scalar_one_or_none()
+        else:
+            store = await self.session.get(Store, id)
+
         if store is None:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
                 detail=f"Store with id {id} not found"
             )
 
-        store.sqlmodel_update(update.model_dump(exclude_unset=True))
-        self.session.add(store)
         await self.session.commit()
-        await self.session.refresh(store)
+        await touch_store(id)
         return store
 
     async def delete(self, id: UUID, manager: StoreManager) -> None:
@@ -84,11 +122,11 @@ class StoreService:
                 detail=f"Store with id {id} not found"
             )
 
-        # Check if store has items
-        result = await self.session.execute(
-            select(Item).where(Item.store_id == id).limit(1)
+        # Check if store has items, from the counters instead of scanning items
+        item_count = await self.session.scalar(
+            select(StoreItemStats.item_count).where(StoreItemStats.store_id == id)
         )
-        if result.scalar() is not None:
+        if item_count:
             raise HTTPException(
                 status_code=HTTPStatus.CONFLICT,
                 detail="Cannot delete store with existing items"
@@ -106,3 +144,6 @@ class StoreService:
         await self.session.delete(store)
         await self.session.flush()
         await self.session.commit()
+        await touch_store(id)
+        if existing_manager:
+            await invalidate_cached_manager(existing_manager.id)
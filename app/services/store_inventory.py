@@ -1,23 +1,59 @@
+from typing import Any
 from uuid import UUID
 from fastapi import HTTPException
 from http import HTTPStatus
+from sqlalchemy import tuple_, update as sql_update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.api.schemas.store_inventory import StoreInventoryCreate, StoreInventoryUpdate
-from app.database.models import StoreInventory, Item
+from app.api.schemas.store_inventory import StoreInventoryCreate, StoreInventoryQuery, StoreInventoryUpdate
+from app.database.models import Region, StoreInventory, StoreInventoryItemStats
+from app.utils import decode_cursor, encode_cursor
+
+STORE_INVENTORY_READ_COLUMNS = (
+    StoreInventory.id, StoreInventory.name, StoreInventory.region, *StoreInventoryItemStats.read_columns()
+)
+
+
+def _select_read_columns():
+    return select(*STORE_INVENTORY_READ_COLUMNS).outerjoin(
+        StoreInventoryItemStats, StoreInventoryItemStats.store_inventory_id == StoreInventory.id
+    )
 
 
 class StoreInventoryService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get(self, id: UUID) -> StoreInventory | None:
-        return await self.session.get(StoreInventory, id)
+    async def read(self, id: UUID) -> dict[str, Any] | None:
+        # A StoreInventoryRead row with its item counters, without building an ORM object
+        result = await self.session.execute(_select_read_columns().where(StoreInventory.id == id))
+        row = result.first()
+        return row._asdict() if row is not None else None
 
-    async def get_all(self) -> list[StoreInventory]:
-        result = await self.session.execute(select(StoreInventory))
-        return list(result.scalars().all())
+    async def read_page(self, query: StoreInventoryQuery) -> dict[str, Any]:
+        # A StoreInventoryPage; the counters are joined in, so one query covers the whole page
+        statement = _select_read_columns()
+        if query.region:
+            statement = statement.where(StoreInventory.region.in_(query.region))
+        if query.cursor is not None:
+            # A plain tuple takes the column types, so the region binds as the enum's stored name
+            statement = statement.where(
+                tuple_(StoreInventory.region, StoreInventory.id) > self._parse_cursor(query.cursor)
+            )
+
+        # Ordered like ix_store_inventories_region_id, so filtered and unfiltered pages both walk the index.
+        # Fetch one extra row to know if there is a next page
+        result = await self.session.execute(
+            statement.order_by(StoreInventory.region, StoreInventory.id).limit(query.limit + 1)
+        )
+        rows = [row._asdict() for row in result.all()]
+        if len(rows) <= query.limit:
+            return {"items": rows, "next_cursor": None}
+
+        rows = rows[:query.limit]
+        last = rows[-1]
+        return {"items": rows, "next_cursor": encode_cursor([last["region"].name, str(last["id"])])}
 
     async def add(self, inventory: StoreInventoryCreate) -> StoreInventory:
         created = StoreInventory(**inventory.model_dump())
@@ -27,17 +63,23 @@ class StoreInventoryService:
         return created
 
     async def update(self, id: UUID, update: StoreInventoryUpdate) -> StoreInventory:
-        inventory = await self.session.get(StoreInventory, id)
+        changes = update.model_dump(exclude_unset=True)
+        if changes:
+            result = await self.session.execute(
+                sql_update(StoreInventory).where(StoreInventory.id == id).values(**changes).returning(StoreInventory),
+                execution_options={"populate_existing": True}
+            )
+            inventory = result.scalar_one_or_none()
+        else:
+            inventory = await self.session.get(StoreInventory, id)
+
         if inventory is None:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
                 detail=f"StoreInventory with id {id} not found"
             )
 
-        inventory.sqlmodel_update(update.model_dump(exclude_unset=True))
-        self.session.add(inventory)
         await self.session.commit()
-        await self.session.refresh(inventory)
         return inventory
 
     async def delete(self, id: UUID) -> None:
@@ -48,11 +90,11 @@ class StoreInventoryService:
                 detail=f"StoreInventory with id {id} not found"
             )
 
-        # Check if inventory has items
-        result = await self.session.execute(
-            select(Item).where(Item.store_inventory_id == id).limit(1)
+        # Check if inventory has items, from the counters instead of scanning items
+        item_count = await self.session.scalar(
+            select(StoreInventoryItemStats.item_count).where(StoreInventoryItemStats.store_inventory_id == id)
         )
-        if result.scalar() is not None:
+        if item_count:
             raise HTTPException(
                 status_code=HTTPStatus.CONFLICT,
                 detail="Cannot delete store inventory with assigned items"
@@ -61,3 +103,14 @@ class StoreInventoryService:
         await self.session.delete(inventory)
         await self.session.flush()
         await self.session.commit()
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> tuple[Region, UUID]:
+        # [region, id], with the region's stored name
+        values = decode_cursor(cursor)
+        try:
+            if len(values) != 2:
+                raise ValueError
+            return Region[values[0]], UUID(values[1])
+        except (TypeError, KeyError, ValueError, AttributeError):
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
@@ -2,16 +2,57 @@ from datetime import timedelta
 from http import HTTPStatus
 from uuid import UUID
 from fastapi import HTTPException
+from redis.exceptions import RedisError
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import select
-from passlib.context import CryptContext
 
 from app.api.schemas.store_manager import StoreManagerCreate, StoreManagerUpdate
-from app.utils import generate_access_token
+from app.cache import TTLCache
+from app.utils import generate_access_token, hash_password, verify_password
 from app.database.models import StoreManager, Store
-from app.database.redis import add_to_token_blacklist
-
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.database.redis import MANAGER_INVALIDATION_CHANNEL, add_to_token_blacklist, publish, subscribe
+from config import app_config
+
+# Identity and store assignment of recently authenticated managers, keyed by manager ID
+manager_cache: TTLCache[UUID, dict] = TTLCache(
+    max_size=app_config.MANAGER_CACHE_MAX_SIZE,
+    ttl=app_config.MANAGER_CACHE_TTL_SECONDS
+)
+
+def get_cached_manager(id: UUID) -> StoreManager | None:
+    snapshot = manager_cache.get(id)
+    if snapshot is None:
+        return None
+
+    # A fresh detached instance per request, so a service can add it to its own session. Filled in the
+    # way the ORM loads a row, which skips the model's __init__ and its per-field validation
+    manager = inspect(StoreManager).class_manager.new_instance()
+    manager.__dict__.update(snapshot)
+    make_transient_to_detached(manager)
+    return manager
+
+def cache_manager(manager: StoreManager, generation: int) -> None:
+    # Skip if an invalidation arrived while the manager was being loaded
+    if manager_cache.generation == generation:
+        manager_cache.set(manager.id, manager.model_dump(include={"id", "name", "email", "store_id"}))
+
+async def invalidate_cached_manager(id: UUID) -> None:
+    manager_cache.pop(id)
+    try:
+        await publish(MANAGER_INVALIDATION_CHANNEL, str(id))
+    except RedisError:
+        # Other workers fall back to the cache TTL
+        pass
+
+def _on_manager_invalidated(message: str) -> None:
+    try:
+        manager_cache.pop(UUID(message))
+    except ValueError:
+        pass
+
+subscribe(MANAGER_INVALIDATION_CHANNEL, _on_manager_invalidated, on_resync=manager_cache.clear)
 
 class StoreManagerService:
     def __init__(self, session: AsyncSession):
@@ -26,7 +67,7 @@ class StoreManagerService:
 
     async def add(self, manager: StoreManagerCreate) -> StoreManager:
         created = StoreManager(**manager.model_dump(exclude=["password_hash"]),
-         password_hash= pwd_ctx.hash(manager.password_hash)
+         password_hash=await hash_password(manager.password_hash)
          )
         self.session.add(created)
         await self.session.commit()
@@ -39,14 +80,14 @@ class StoreManagerService:
 
         if store_manager is None:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Store Manager not found")
-        if not pwd_ctx.verify(password_hash, store_manager.password_hash):
+        if not await verify_password(password_hash, store_manager.password_hash):
             raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Invalid credentials")
 
         access_token = generate_access_token(data={"user": store_manager.name, "id": str(store_manager.id)}, expiry=timedelta(days=1))
         return {"access_token": access_token, "token_type": "jwt"}
 
-    async def logout(self, token_id: str) -> None:
-        await add_to_token_blacklist(token_id)
+    async def logout(self, token_id: str, expires_at: int) -> None:
+        await add_to_token_blacklist(token_id, expires_at)
 
     async def update(self, id: UUID, update: StoreManagerUpdate, current_manager: StoreManager) -> StoreManager:
         # Verify manager is updating their own profile
@@ -68,7 +109,7 @@ class StoreManagerService:
         # Handle password update separately
         if "password" in update_dict:
             password = update_dict.pop("password")
-            update_dict["password_hash"] = pwd_ctx.hash(password)
+            update_dict["password_hash"] = await hash_password(password)
 
         # Handle email uniqueness check
         if "email" in update_dict and update_dict["email"] != manager.email:
@@ -108,6 +149,7 @@ class StoreManagerService:
         manager.sqlmodel_update(update_dict)
         self.session.add(manager)
         await self.session.commit()
+        await invalidate_cached_manager(manager.id)
         await self.session.refresh(manager)
         return manager
 
@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+
+# Taken before the imports below, which are most of what importing the app costs
+_import_started = perf_counter()
+
+from app.metrics import Gauge, registry
+
+# Seconds this worker spent in each startup phase, in the order they ran
+startup_timings: dict[str, float] = {}
+
+
+def record_import() -> None:
+    startup_timings["import"] = perf_counter() - _import_started
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[phase] = perf_counter() - started
+
+
+registry.register(Gauge(
+    "app_startup_seconds", "Time this worker spent in each startup phase", ("phase",),
+    lambda: {(phase,): seconds for phase, seconds in startup_timings.items()}
+))
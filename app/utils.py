@@ -1,8 +1,24 @@
+import asyncio
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+from http import HTTPStatus
+from time import time
+from typing import Callable
 from uuid import uuid4
 
 import jwt
-from config import security_config
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.cache import TTLCache
+from config import app_config, security_config
+
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Claims of tokens whose signature was already verified, keyed by token digest, kept until the token expires
+token_cache: TTLCache[bytes, dict[str, str | int]] = TTLCache(max_size=app_config.TOKEN_CACHE_MAX_SIZE, ttl=0)
 
 
 def generate_access_token(data: dict[str, str | int], expiry: timedelta = timedelta(days=1)) -> str | None:
@@ -20,11 +36,74 @@ def generate_access_token(data: dict[str, str | int], expiry: timedelta = timede
         return None
 
 def decode_access_token(token: str) -> dict[str, str | int] | None:
+    digest = sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is not None:
+        return claims
+
     try:
-        return jwt.decode(
+        claims = jwt.decode(
                 jwt=token,
                 key=security_config.JWT_SECRET,
                 algorithms=[security_config.JWT_ALGORITHM],
                 )
     except jwt.PyJWTError:
-        return None
\ No newline at end of file
+        return None
+
+    expiry = claims.get("exp")
+    if isinstance(expiry, int | float) and expiry > time():
+        token_cache.set(digest, claims, ttl=expiry - time())
+    return claims
+
+def encode_cursor(values: list[str]) -> str:
+    return urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list[str] | None:
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+# bcrypt releases the GIL, so a thread pool runs hashes in parallel without blocking the event loop
+_password_executor: ThreadPoolExecutor | None = None
+_password_jobs = 0
+
+async def _run_password_job[T](fn: Callable[..., T], *args: str) -> T:
+    global _password_executor, _password_jobs
+    if _password_jobs >= app_config.PASSWORD_HASH_MAX_WORKERS + app_config.PASSWORD_HASH_MAX_QUEUE:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Too many password checks in progress, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=app_config.PASSWORD_HASH_MAX_WORKERS,
+            thread_name_prefix="password-hash"
+        )
+
+    loop = asyncio.get_running_loop()
+
+    def release(_: Future) -> None:
+        global _password_jobs
+        _password_jobs -= 1
+
+    # The slot is freed when the job itself finishes, not when the awaiting request goes away
+    _password_jobs += 1
+    job = _password_executor.submit(fn, *args)
+    job.add_done_callback(lambda future: loop.call_soon_threadsafe(release, future))
+    return await asyncio.wrap_future(job)
+
+async def hash_password(password: str) -> str:
+    return await _run_password_job(pwd_ctx.hash, password)
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await _run_password_job(pwd_ctx.verify, password, password_hash)
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=True, cancel_futures=True)
+        _password_executor = None
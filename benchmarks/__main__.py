@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.backends import BACKENDS
+from benchmarks.cases import build
+from benchmarks.harness import compare, run_all
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Microbenchmarks of the API's hot paths")
+    parser.add_argument("--backend", choices=BACKENDS, default="memory",
+                        help="memory needs no database or network; postgres uses the configured PostgreSQL and Redis")
+    parser.add_argument("--items", type=int, default=1000, help="Items in the benchmark store (default: 1000)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed batches per benchmark (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timed batch (default: 0.2)")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--save", type=Path, help="Write the report to this file, e.g. as a new baseline")
+    parser.add_argument("--compare", type=Path, help="Compare against a report saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change that counts as a regression with --compare (default: 0.10)")
+    return parser.parse_args()
+
+async def run(args: argparse.Namespace) -> dict:
+    async with BACKENDS[args.backend](args.items) as fixture:
+        benchmarks = [benchmark for benchmark in build(fixture) if args.filter in benchmark.name]
+        results = await run_all(benchmarks, args.repeats, args.min_time)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "backend": args.backend,
+            "items": args.items,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+def main() -> int:
+    args = parse_args()
+    report = asyncio.run(run(args))
+
+    regressed = False
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        report["comparison"], regressed = compare(report["results"], baseline["results"], args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.save is not None:
+        args.save.write_text(output + "\n")
+    print(output)
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import random
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from functools import cache
+from typing import AsyncIterator
+from uuid import UUID
+from weakref import WeakValueDictionary
+
+from sqlalchemy import delete, insert
+
+from app.database.models import Category, Item, Store, StoreManager
+from app.utils import generate_access_token, pwd_ctx
+
+PASSWORD = "benchmark-password"
+SEED_BATCH_SIZE = 1000
+
+
+class Fixture:
+    """Data and session shared by every benchmark of one run."""
+
+    def __init__(self, session, manager: StoreManager, items: list[Item], password_hash: str):
+        self.session = session
+        self.manager = manager
+        self.items = items
+        self.password_hash = password_hash
+        self.token = generate_access_token({"id": str(manager.id), "email": manager.email})
+
+
+def make_items(store_id: UUID, count: int) -> list[Item]:
+    # Seeded, so every run benchmarks the same data
+    rng = random.Random(0)
+    categories = list(Category)
+    return [
+        Item(
+            id=UUID(int=rng.getrandbits(128), version=4),
+            name=f"Item {index}",
+            category=rng.choice(categories),
+            price_usd=round(rng.uniform(0.5, 500), 2),
+            in_stock=rng.random() < 0.8,
+            store_id=store_id,
+        )
+        for index in range(count)
+    ]
+
+
+class _Result:
+    def __init__(self, rows: list):
+        self._rows = rows
+
+    def scalars(self) -> "_Result":
+        return self
+
+    def all(self) -> list:
+        return list(self._rows)
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+
+@cache
+def _row_type(columns: tuple[str, ...]) -> type:
+    # Stands in for SQLAlchemy's Row, which offers the same _asdict()
+    return namedtuple("Row", columns)
+
+
+class MemorySession:
+    """Just enough of AsyncSession for the benchmarked code paths, backed by dicts.
+
+    Statements are still built by the services, but `execute` only looks at
+    what they select: every select returns the seeded store's items, as ORM
+    objects or as rows of the selected columns, which is what the
+    benchmarked ItemService reads ask for.
+    """
+
+    def __init__(self, managers: list[StoreManager], items: list[Item]):
+        self._objects: dict[type, dict[UUID, object]] = {
+            StoreManager: {manager.id: manager for manager in managers},
+            Item: {item.id: item for item in items},
+        }
+        # Added objects are held weakly, like AsyncSession's identity map, so what a benchmark creates
+        # is freed with its iteration instead of piling up across the run
+        self._added: WeakValueDictionary[tuple[type, UUID], object] = WeakValueDictionary()
+        self._store_items = items
+        self._rows: dict[tuple[str, ...], list] = {}
+
+    async def execute(self, statement, *args, **kwargs) -> _Result:
+        columns = tuple(column["name"] for column in statement.column_descriptions)
+        if columns == ("Item",):
+            return _Result(self._store_items)
+
+        rows = self._rows.get(columns)
+        if rows is None:
+            # Built once per column list, like rows that come back from the database for free
+            row = _row_type(columns)
+            rows = self._rows[columns] = [row(*(getattr(item, column) for column in columns)) for item in self._store_items]
+        return _Result(rows)
+
+    async def get(self, model: type, id: UUID):
+        seeded = self._objects[model].get(id)
+        return seeded if seeded is not None else self._added.get((model, id))
+
+    def add(self, instance) -> None:
+        if instance.id not in self._objects[type(instance)]:
+            self._added[type(instance), instance.id] = instance
+
+    async def commit(self) -> None:
+        pass
+
+    async def refresh(self, instance) -> None:
+        pass
+
+
+@asynccontextmanager
+async def memory_backend(item_count: int) -> AsyncIterator[Fixture]:
+    import app.services.item
+    from app.database.redis import token_blacklist_mirror
+
+    async def skip_touch_store(store_id: UUID) -> None:
+        pass
+
+    # Keep Redis out of the picture: an empty, synced blacklist mirror and no store version bumps
+    token_blacklist_mirror.synced = True
+    touch_store = app.services.item.touch_store
+    app.services.item.touch_store = skip_touch_store
+
+    password_hash = pwd_ctx.hash(PASSWORD)
+    store = Store(id=UUID(int=1, version=4), name="Benchmark store", location="Nowhere")
+    manager = StoreManager(
+        id=UUID(int=2, version=4), name="Benchmark", email="benchmark@example.com",
+        password_hash=password_hash, store_id=store.id
+    )
+    items = make_items(store.id, item_count)
+    try:
+        yield Fixture(MemorySession([manager], items), manager, items, password_hash)
+    finally:
+        app.services.item.touch_store = touch_store
+        token_blacklist_mirror.synced = False
+
+
+@asynccontextmanager
+async def postgres_backend(item_count: int) -> AsyncIterator[Fixture]:
+    # Uses the configured PostgreSQL and Redis; everything it creates is removed afterwards
+    from app.database.session import async_session_maker
+
+    password_hash = pwd_ctx.hash(PASSWORD)
+    async with async_session_maker() as session:
+        store = Store(name="Benchmark store", location="Nowhere")
+        session.add(store)
+        await session.flush()
+        manager = StoreManager(
+            name="Benchmark", email=f"benchmark-{store.id}@example.com", password_hash=password_hash, store_id=store.id
+        )
+        session.add(manager)
+        items = make_items(store.id, item_count)
+        # In batches, since one statement can bind at most 65535 parameters
+        for start in range(0, len(items), SEED_BATCH_SIZE):
+            batch = items[start:start + SEED_BATCH_SIZE]
+            await session.execute(insert(Item).values([item.model_dump() for item in batch]))
+        await session.commit()
+
+        try:
+            yield Fixture(session, manager, items, password_hash)
+        finally:
+            await session.rollback()
+            await session.execute(delete(Item).where(Item.store_id == store.id))
+            await session.execute(delete(StoreManager).where(StoreManager.id == manager.id))
+            await session.execute(delete(Store).where(Store.id == store.id))
+            await session.commit()
+
+BACKENDS = {"memory": memory_backend, "postgres": postgres_backend}
@@ -0,0 +1,78 @@
+from uuid import UUID
+
+from fastapi import FastAPI, Response
+
+from app.api.core.responses import FastJSONResponse
+from app.api.dependencies import get_current_manager
+from app.api.schemas.item import ItemCreate, ItemPage, ItemQuery, ItemRead
+from app.database.models import Category, Item
+from app.services.item import ItemService
+from app.services.store_manager import manager_cache
+from app.utils import decode_access_token, generate_access_token, pwd_ctx, token_cache
+from benchmarks.backends import PASSWORD, Fixture
+from benchmarks.harness import Benchmark
+
+
+async def call_asgi(app: FastAPI, path: str) -> bytes:
+    # Drives the app in process, no sockets, so only routing, validation and serialization are measured
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+        "server": ("benchmark", 80), "client": ("benchmark", 1),
+    }
+    body = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+def serialization_app(items: list[Item]) -> FastAPI:
+    app = FastAPI()
+
+    rows = [item.model_dump(include=set(ItemRead.model_fields)) for item in items]
+
+    # The response path list routes used before FastJSONResponse
+    @app.get("/items-dict", response_model=dict[UUID, Item])
+    async def items_dict() -> dict[UUID, Item]:
+        return {item.id: item for item in items}
+
+    @app.get("/items-page", response_model=ItemPage)
+    async def items_page() -> Response:
+        return FastJSONResponse({"items": rows, "next_cursor": None})
+
+    return app
+
+def build(fixture: Fixture) -> list[Benchmark]:
+    service = ItemService(fixture.session)
+    manager = fixture.manager
+    new_item = ItemCreate(name="Benchmark item", category=Category.GROCERY, price_usd=1.5, in_stock=True)
+    app = serialization_app(fixture.items)
+    page_query = ItemQuery(limit=1000)
+
+    async def get_current_manager_uncached():
+        manager_cache.clear()
+        return await get_current_manager(fixture.token, fixture.session)
+
+    def decode_uncached():
+        token_cache.clear()
+        return decode_access_token(fixture.token)
+
+    return [
+        Benchmark("item_service.get_all", lambda: service.get_all(manager), is_async=True),
+        Benchmark("item_service.read_page_json", lambda: service.read_page_json(manager, page_query), is_async=True),
+        Benchmark("item_service.add", lambda: service.add(new_item, manager), is_async=True),
+        Benchmark("auth.generate_access_token", lambda: generate_access_token({"id": str(manager.id), "email": manager.email})),
+        Benchmark("auth.decode_access_token.cached", lambda: decode_access_token(fixture.token)),
+        Benchmark("auth.decode_access_token.uncached", decode_uncached),
+        Benchmark("auth.get_current_manager.cached", lambda: get_current_manager(fixture.token, fixture.session), is_async=True),
+        Benchmark("auth.get_current_manager.uncached", get_current_manager_uncached, is_async=True),
+        Benchmark("auth.pwd_ctx.verify", lambda: pwd_ctx.verify(PASSWORD, fixture.password_hash)),
+        Benchmark("serialize.items_dict", lambda: call_asgi(app, "/items-dict"), is_async=True),
+        Benchmark("serialize.items_page_fast", lambda: call_asgi(app, "/items-page"), is_async=True),
+    ]
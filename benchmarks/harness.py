@@ -0,0 +1,104 @@
+import gc
+import statistics
+import tracemalloc
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+Operation = Callable[[], Any] | Callable[[], Awaitable[Any]]
+
+
+class Benchmark:
+    """One timed operation. `run` is called with no arguments and may be a coroutine function."""
+
+    def __init__(self, name: str, run: Operation, is_async: bool = False):
+        self.name = name
+        self.run = run
+        self.is_async = is_async
+
+
+async def _time_batch(benchmark: Benchmark, iterations: int) -> float:
+    # The loop stays inside one coroutine so scheduling overhead isn't counted per operation
+    run = benchmark.run
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = perf_counter()
+        if benchmark.is_async:
+            for _ in range(iterations):
+                await run()
+        else:
+            for _ in range(iterations):
+                run()
+        return perf_counter() - started
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+async def _calibrate(benchmark: Benchmark, min_time: float) -> int:
+    # Double the batch until it runs for at least min_time
+    iterations = 1
+    while True:
+        elapsed = await _time_batch(benchmark, iterations)
+        if elapsed >= min_time or iterations >= 1 << 24:
+            return iterations
+        iterations = iterations * 2 if elapsed < min_time / 10 else max(iterations + 1, int(iterations * min_time / elapsed))
+
+async def _measure_memory(benchmark: Benchmark) -> tuple[int, int]:
+    # Peak traced memory above the starting point during one operation, and what it left allocated
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        if benchmark.is_async:
+            await benchmark.run()
+        else:
+            benchmark.run()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - before, after - before
+
+async def measure(benchmark: Benchmark, repeats: int, min_time: float) -> dict[str, float | int]:
+    # One untimed run warms caches, imports and lazily compiled statements
+    await _time_batch(benchmark, 1)
+    iterations = await _calibrate(benchmark, min_time)
+    per_op = [await _time_batch(benchmark, iterations) / iterations for _ in range(repeats)]
+    peak_bytes, retained_bytes = await _measure_memory(benchmark)
+
+    median = statistics.median(per_op)
+    return {
+        "ops_per_sec": 1 / median if median > 0 else float("inf"),
+        "median_us": median * 1e6,
+        "min_us": min(per_op) * 1e6,
+        "stdev_us": statistics.stdev(per_op) * 1e6 if len(per_op) > 1 else 0.0,
+        "iterations": iterations,
+        "repeats": repeats,
+        "peak_bytes": peak_bytes,
+        "retained_bytes": retained_bytes,
+    }
+
+async def run_all(benchmarks: list[Benchmark], repeats: int, min_time: float) -> dict[str, dict[str, float | int]]:
+    return {benchmark.name: await measure(benchmark, repeats, min_time) for benchmark in benchmarks}
+
+def compare(
+    current: dict[str, dict[str, float | int]],
+    baseline: dict[str, dict[str, float | int]],
+    threshold: float
+) -> tuple[list[dict[str, Any]], bool]:
+    # A benchmark regresses when its throughput drops, or its peak memory grows, by more than threshold
+    rows, regressed = [], False
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append({"name": name, "status": "new"})
+            continue
+
+        speed = result["ops_per_sec"] / base["ops_per_sec"] - 1 if base["ops_per_sec"] else 0.0
+        memory = result["peak_bytes"] / base["peak_bytes"] - 1 if base["peak_bytes"] else 0.0
+        status = "regressed" if speed < -threshold or memory > threshold else "ok"
+        if speed > threshold and status == "ok":
+            status = "improved"
+        regressed |= status == "regressed"
+        rows.append({"name": name, "status": status, "ops_per_sec_change": speed, "peak_bytes_change": memory})
+    return rows, regressed